@@ -38,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'rest_framework',
     'corsheaders',
     'products',
@@ -90,6 +91,44 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# CACHE_BACKEND selects the cache tier shared by all workers: 'redis',
+# 'memcached', 'database', 'file' or 'locmem'. Only 'redis', 'memcached' and
+# 'database' are valid shared tiers: image cache invalidation and the
+# single-flight rebuild leases rely on an add() that is atomic across
+# processes. 'file' implements add() as a read followed by a write, and
+# 'locmem' keeps a separate cache per process, so both are meant for a single
+# worker in local development.
+# Every key is stored as "<CACHE_KEY_PREFIX>:<CACHE_VERSION>:<key>", so bumping
+# CACHE_VERSION invalidates the whole namespace on deploy.
+
+CACHE_BACKENDS = {
+    'redis': ('django.core.cache.backends.redis.RedisCache', 'redis://localhost:6379/1'),
+    'memcached': ('django.core.cache.backends.memcached.PyMemcacheCache', '127.0.0.1:11211'),
+    'database': ('django.core.cache.backends.db.DatabaseCache', 'django_cache'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache', os.path.join(BASE_DIR, 'cache')),
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'amigurumi-store'),
+}
+
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'locmem').lower()
+if CACHE_BACKEND not in CACHE_BACKENDS:
+    raise ValueError(
+        f"Unknown CACHE_BACKEND '{CACHE_BACKEND}', expected one of: {', '.join(CACHE_BACKENDS)}"
+    )
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND][0],
+        'LOCATION': os.environ.get('CACHE_LOCATION', CACHE_BACKENDS[CACHE_BACKEND][1]),
+        'KEY_PREFIX': os.environ.get('CACHE_KEY_PREFIX', 'amigurumi'),
+        'VERSION': int(os.environ.get('CACHE_VERSION', '1')),
+        'TIMEOUT': int(os.environ.get('CACHE_DEFAULT_TIMEOUT', '3600')),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -142,10 +181,34 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.AllowAny',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        # Same output as rest_framework.renderers.JSONRenderer, rendered by orjson
+        'products.renderers.ORJSONRenderer',
     ],
 }
 
+# Product list endpoints use cursor pagination on created_at
+PRODUCTS_PAGE_SIZE = int(os.environ.get('PRODUCTS_PAGE_SIZE', '24'))
+PRODUCTS_MAX_PAGE_SIZE = int(os.environ.get('PRODUCTS_MAX_PAGE_SIZE', '100'))
+
+# /api/products/search/: text search configuration of the search_vector
+# column (re-run update_search_vectors after changing it), and the upper
+# bounds of the price facet buckets
+PRODUCTS_SEARCH_CONFIG = os.environ.get('PRODUCTS_SEARCH_CONFIG', 'english')
+PRODUCTS_SEARCH_PRICE_BUCKETS = [
+    int(bound) for bound in os.environ.get('PRODUCTS_SEARCH_PRICE_BUCKETS', '10,25,50').split(',') if bound
+]
+
+# Product endpoints send ETag/Last-Modified and answer conditional GETs with 304.
+# Cache-Control max-age; with presigned URLs it is capped at half of the URL
+# lifetime left when an entry is served (S3_IMAGE_CACHE_REFRESH_BUFFER)
+CATALOG_CACHE_MAX_AGE = int(os.environ.get('CATALOG_CACHE_MAX_AGE', '60'))
+
+# Rendered list/featured/category responses are cached per catalog version,
+# which product saves/deletes and image uploads/deletes bump. Entries are
+# dropped before the earliest presigned URL they contain needs refreshing.
+# 0 disables the response cache.
+CATALOG_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('CATALOG_RESPONSE_CACHE_TIMEOUT', '300'))
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -171,6 +234,98 @@ AWS_S3_VERIFY = False
 AWS_QUERYSTRING_AUTH = False
 AWS_S3_FILE_OVERWRITE = False
 
+# Shared S3 client used by products.services (one per process)
+S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', '50'))
+S3_TCP_KEEPALIVE = os.environ.get('S3_TCP_KEEPALIVE', 'true').lower() == 'true'
+S3_CONNECT_TIMEOUT = int(os.environ.get('S3_CONNECT_TIMEOUT', '5'))
+S3_READ_TIMEOUT = int(os.environ.get('S3_READ_TIMEOUT', '30'))
+S3_MAX_RETRY_ATTEMPTS = int(os.environ.get('S3_MAX_RETRY_ATTEMPTS', '3'))
+S3_RETRY_MODE = os.environ.get('S3_RETRY_MODE', 'standard')
+
+# Managed uploads (boto3 TransferConfig): files above the threshold are sent as
+# multipart uploads of S3_UPLOAD_MULTIPART_CHUNKSIZE bytes, up to
+# S3_UPLOAD_MAX_CONCURRENCY parts at a time
+S3_UPLOAD_MULTIPART_THRESHOLD = int(os.environ.get('S3_UPLOAD_MULTIPART_THRESHOLD', str(8 * 1024 * 1024)))
+S3_UPLOAD_MULTIPART_CHUNKSIZE = int(os.environ.get('S3_UPLOAD_MULTIPART_CHUNKSIZE', str(8 * 1024 * 1024)))
+S3_UPLOAD_MAX_CONCURRENCY = int(os.environ.get('S3_UPLOAD_MAX_CONCURRENCY', '4'))
+
+# Sign presigned URLs offline (SigV4 only) instead of one botocore call per key
+S3_FAST_PRESIGN = os.environ.get('S3_FAST_PRESIGN', 'true').lower() == 'true'
+
+# Sign presigned URLs at the start of fixed windows of this many seconds (e.g.
+# 3600) so every worker hands out identical, HTTP-cacheable URLs within a
+# window. URLs then live S3_PRESIGNED_URL_EXPIRATION plus one window. 0 signs
+# at the current time. Needs SigV4 credentials (uses the offline signer).
+S3_PRESIGN_TIME_WINDOW = int(os.environ.get('S3_PRESIGN_TIME_WINDOW', '0'))
+
+# How image URLs are built: 'presigned' signs every URL, 'public' points at the
+# public-read objects in the bucket (S3_IMAGE_PUBLIC_BASE_URL, derived from the
+# endpoint or region when empty) and 'cdn' at S3_IMAGE_CDN_BASE_URL. Public and
+# CDN URLs never expire, so their cache entries live until invalidated. With
+# S3_IMAGE_CDN_SIGNING_KEY set, CDN URLs carry ?sig=<HMAC-SHA256 of the path>.
+S3_IMAGE_URL_MODE = os.environ.get('S3_IMAGE_URL_MODE', 'presigned')
+S3_IMAGE_PUBLIC_BASE_URL = os.environ.get('S3_IMAGE_PUBLIC_BASE_URL', '')
+S3_IMAGE_CDN_BASE_URL = os.environ.get('S3_IMAGE_CDN_BASE_URL', '')
+S3_IMAGE_CDN_SIGNING_KEY = os.environ.get('S3_IMAGE_CDN_SIGNING_KEY', '')
+
+# Maximum concurrent S3 lookups when resolving images for a page of products
+S3_IMAGE_FETCH_WORKERS = int(os.environ.get('S3_IMAGE_FETCH_WORKERS', '8'))
+# Async (ASGI) views: maximum concurrent image rebuilds per page, and the size
+# of the process-wide thread pool they run on
+S3_IMAGE_ASYNC_FETCH_CONCURRENCY = int(os.environ.get('S3_IMAGE_ASYNC_FETCH_CONCURRENCY', '8'))
+S3_IMAGE_ASYNC_FETCH_THREADS = int(os.environ.get('S3_IMAGE_ASYNC_FETCH_THREADS', '32'))
+
+# Where the image service finds a product's image keys on a cache miss:
+# 'manifest' reads the ProductImage table (kept in sync by uploads, deletes and
+# reconcile_image_manifest), 's3' lists the "<product_id>/" prefix in S3.
+S3_IMAGE_SOURCE = os.environ.get('S3_IMAGE_SOURCE', 'manifest')
+# With the manifest source, products that have no manifest rows yet (images
+# uploaded outside Django and not reconciled) are listed in S3 instead. Turn
+# off once reconcile_image_manifest runs after every out-of-band upload.
+S3_IMAGE_MANIFEST_LIST_FALLBACK = os.environ.get('S3_IMAGE_MANIFEST_LIST_FALLBACK', 'true').lower() == 'true'
+
+# Keys requested per list_objects_v2 page (S3 returns at most 1000)
+S3_LIST_PAGE_SIZE = int(os.environ.get('S3_LIST_PAGE_SIZE', '1000'))
+
+# In-process (L1) cache in front of the shared cache for product image entries.
+# L1 entries are re-checked against the shared version stamp at most every
+# S3_IMAGE_L1_VERSION_CHECK_INTERVAL seconds, which bounds how long another
+# worker can keep serving images after invalidate_product_cache.
+S3_IMAGE_L1_MAX_ENTRIES = int(os.environ.get('S3_IMAGE_L1_MAX_ENTRIES', '1024'))
+S3_IMAGE_L1_VERSION_CHECK_INTERVAL = int(os.environ.get('S3_IMAGE_L1_VERSION_CHECK_INTERVAL', '5'))
+
+# Presigned URL freshness. Cached entries are fresh until their first URL is
+# S3_IMAGE_CACHE_REFRESH_BUFFER seconds from expiry. With stale-while-revalidate
+# enabled they are then served as-is (until S3_IMAGE_CACHE_STALE_BUFFER seconds
+# from expiry) while a single background refresh per product rebuilds them.
+S3_IMAGE_CACHE_REFRESH_BUFFER = int(os.environ.get('S3_IMAGE_CACHE_REFRESH_BUFFER', '300'))
+S3_IMAGE_CACHE_STALE_BUFFER = int(os.environ.get('S3_IMAGE_CACHE_STALE_BUFFER', '60'))
+S3_IMAGE_CACHE_STALE_WHILE_REVALIDATE = os.environ.get('S3_IMAGE_CACHE_STALE_WHILE_REVALIDATE', 'false').lower() == 'true'
+S3_IMAGE_REFRESH_WORKERS = int(os.environ.get('S3_IMAGE_REFRESH_WORKERS', '2'))
+
+# Single-flight rebuilds: only the holder of a short per-product lease in the
+# shared cache lists and signs a missing entry. Other workers serve stale URLs
+# or wait up to S3_IMAGE_REBUILD_WAIT seconds for the holder's entry.
+S3_IMAGE_REFRESH_LOCK_TIMEOUT = int(os.environ.get('S3_IMAGE_REFRESH_LOCK_TIMEOUT', '10'))
+S3_IMAGE_REBUILD_WAIT = float(os.environ.get('S3_IMAGE_REBUILD_WAIT', '2.0'))
+S3_IMAGE_REBUILD_POLL_INTERVAL = float(os.environ.get('S3_IMAGE_REBUILD_POLL_INTERVAL', '0.05'))
+
+# Resized copies generated with Pillow when an image is uploaded, stored as
+# "<S3_IMAGE_VARIANT_PREFIX>/<product_id>/<filename>/<name>.<format>". Widths
+# are maximums: images narrower than a variant are re-encoded, not upscaled.
+S3_IMAGE_VARIANTS = {
+    'thumb': int(os.environ.get('S3_IMAGE_VARIANT_THUMB_WIDTH', '160')),
+    'card': int(os.environ.get('S3_IMAGE_VARIANT_CARD_WIDTH', '480')),
+    'detail': int(os.environ.get('S3_IMAGE_VARIANT_DETAIL_WIDTH', '1200')),
+}
+S3_IMAGE_VARIANT_PREFIX = os.environ.get('S3_IMAGE_VARIANT_PREFIX', 'variants')
+S3_IMAGE_VARIANT_FORMAT = os.environ.get('S3_IMAGE_VARIANT_FORMAT', 'webp')  # 'webp' or 'jpeg'
+S3_IMAGE_VARIANT_QUALITY = int(os.environ.get('S3_IMAGE_VARIANT_QUALITY', '80'))
+
+# Width in pixels of the base64 preview stored with each image for blur-up
+# placeholders (16px is a few hundred bytes per image in the payload)
+S3_IMAGE_PLACEHOLDER_WIDTH = int(os.environ.get('S3_IMAGE_PLACEHOLDER_WIDTH', '16'))
+
 # Use S3 for media files in development with LocalStack
 USE_S3 = True
 
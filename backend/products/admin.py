@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import AmigurumiProduct
+from .models import AmigurumiProduct, ProductImage
+
+class ProductImageInline(admin.TabularInline):
+    model = ProductImage
+    extra = 0
+    fields = ['key', 'position', 'size', 'content_type', 'width', 'height']
+    readonly_fields = ['key', 'size', 'content_type', 'width', 'height']
 
 @admin.register(AmigurumiProduct)
 class AmigurumiProductAdmin(admin.ModelAdmin):
@@ -7,3 +13,4 @@ class AmigurumiProductAdmin(admin.ModelAdmin):
     list_filter = ['category', 'is_featured', 'is_available']
     search_fields = ['name', 'description']
     list_editable = ['is_featured', 'is_available']
+    inlines = [ProductImageInline]
@@ -0,0 +1,324 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.utils import timezone as django_timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from products import services
+from products.models import AmigurumiProduct
+from products.renderers import ORJSONRenderer
+from products.serializers import AmigurumiProductSerializer, serialize_product_rows
+from products.services import S3ImageService
+from datetime import datetime, timedelta
+from decimal import Decimal
+from unittest import mock
+import asyncio
+import pickle
+import statistics
+import time
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmarks for the product image service'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            choices=['client', 'signing', 'cache-entry', 'render', 'async-views'],
+            default='client',
+            help='Benchmark scenario to run'
+        )
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=20,
+            help='Number of products per simulated list response'
+        )
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=10,
+            help='Number of simulated requests to time'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Requests in flight at once (async-views)'
+        )
+        parser.add_argument(
+            '--s3-latency',
+            type=float,
+            default=50,
+            help='Simulated S3 latency per product image rebuild, in ms (async-views)'
+        )
+
+    def handle(self, *args, **options):
+        getattr(self, f"_bench_{options['scenario'].replace('-', '_')}")(options)
+
+    def _report(self, label: str, elapsed: float, iterations: int):
+        per_request_ms = elapsed / iterations * 1000
+        self.stdout.write(f'{label:<40} {per_request_ms:10.2f} ms/request')
+
+    def _bench_client(self, options):
+        """Compare S3 client setup cost per list response before and after pooling"""
+        products = options['products']
+        iterations = options['iterations']
+        self.stdout.write(
+            f'Simulating {iterations} list responses of {products} products '
+            f'(2 service instances per product)'
+        )
+
+        # Before: every S3ImageService built its own boto3 client
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for _ in range(products * 2):
+                services._create_s3_client()
+        self._report('new client per service', time.perf_counter() - start, iterations)
+
+        # After: every service shares the process-wide client
+        services.reset_s3_client()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for _ in range(products * 2):
+                S3ImageService()
+        self._report('shared process-wide client', time.perf_counter() - start, iterations)
+
+    def _bench_signing(self, options):
+        """Compare signing throughput of boto3 and the offline signer"""
+        service = S3ImageService()
+        signer = services.get_presigned_url_signer(service.s3_client, service.bucket_name)
+        if signer is None:
+            raise CommandError('Offline signing is disabled or unsupported for the configured client')
+
+        keys = [
+            f'{product_id}/image {index}+(é)~.jpg'
+            for product_id in range(options['products'])
+            for index in range(3)
+        ]
+
+        iterations = options['iterations']
+        self.stdout.write(f'Signing {len(keys)} keys per request')
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for key in keys:
+                service.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': service.bucket_name, 'Key': key},
+                    ExpiresIn=service.presigned_url_expiration
+                )
+        self._report('boto3 generate_presigned_url', time.perf_counter() - start, iterations)
+
+        start = time.perf_counter()
+        for _ in range(iterations):
+            signer.generate_presigned_urls(keys, service.presigned_url_expiration)
+        self._report('offline signer', time.perf_counter() - start, iterations)
+
+    def _bench_cache_entry(self, options):
+        """Compare the dict-of-datetimes cache entry with the compact tuple layout"""
+        service = S3ImageService()
+        products = options['products']
+        iterations = options['iterations']
+
+        # Realistic entries: 3 images per product, each with 3 variants and a placeholder
+        entries = []
+        for product_id in range(products):
+            keys = [f'{product_id}/image_{index}.jpg' for index in range(3)]
+            metadata = {
+                key: {
+                    'width': 900,
+                    'height': 1200,
+                    'size': 165016,
+                    'placeholder': 'data:image/webp;base64,' + 'A' * 140,
+                    'variants': {
+                        name: {'key': f'variants/{key}/{name}.webp', 'width': width, 'height': width * 4 // 3}
+                        for name, width in (('thumb', 160), ('card', 480), ('detail', 900))
+                    },
+                }
+                for key in keys
+            }
+            entries.append(service._generate_presigned_urls(keys, metadata))
+
+        legacy = [
+            {'images': images, 'cached_at': datetime.now(), 'is_default': False, 'version': None}
+            for images in entries
+        ]
+        url_layout = service._get_url_layout()
+        compact = [services._encode_cache_entry(images, None, *url_layout, timeout=service.cache_timeout) for images in entries]
+
+        if any(services._decode_cache_entry(entry) != self._floor_expiry(images)
+               for entry, images in zip(compact, entries)):
+            raise CommandError('Decoded entries differ from the original images')
+
+        legacy_bytes = [pickle.dumps(entry, pickle.HIGHEST_PROTOCOL) for entry in legacy]
+        compact_bytes = [pickle.dumps(entry, pickle.HIGHEST_PROTOCOL) for entry in compact]
+        self.stdout.write(
+            f'{products} entries of 3 images with 3 variants each, {iterations} iterations'
+        )
+        self.stdout.write(
+            f'{"bytes per entry (dict)":<40} {sum(map(len, legacy_bytes)) / products:10.0f}'
+        )
+        self.stdout.write(
+            f'{"bytes per entry (compact)":<40} {sum(map(len, compact_bytes)) / products:10.0f}'
+        )
+
+        def timed(label, func):
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            self._report(label, time.perf_counter() - start, iterations)
+
+        timed('encode (dict, pickle)', lambda: [pickle.dumps(entry, pickle.HIGHEST_PROTOCOL) for entry in legacy])
+        timed('encode (compact, pickle)', lambda: [
+            pickle.dumps(services._encode_cache_entry(images, None, *url_layout, timeout=service.cache_timeout), pickle.HIGHEST_PROTOCOL)
+            for images in entries
+        ])
+        timed('decode (dict, unpickle)', lambda: [pickle.loads(data) for data in legacy_bytes])
+        timed('decode (compact, unpickle)', lambda: [
+            services._decode_cache_entry(pickle.loads(data)) for data in compact_bytes
+        ])
+        timed('validity check (dict)', lambda: [
+            # What _is_cache_valid did before: scan every image's datetime
+            services._get_min_expires_at(entry['images']) for entry in legacy
+        ])
+        timed('validity check (compact)', lambda: [
+            service._get_cache_state(services._read_cache_entry_header(entry)[1]) for entry in compact
+        ])
+
+    def _bench_render(self, options):
+        """Compare ModelSerializer + JSONRenderer with values() rows + orjson for one page"""
+        service = S3ImageService()
+        products = options['products']
+        iterations = options['iterations']
+
+        # Rows as values() returns them, and images as the cache serves them
+        now = django_timezone.now()
+        rows = [
+            {
+                'id': product_id,
+                'name': f'Amigurumi {product_id}',
+                'description': 'Hand-crocheted cotton amigurumi, about 20 cm tall. ' * 4,
+                'price': Decimal('24.50'),
+                'category': 'ANIMAL',
+                'is_featured': product_id % 5 == 0,
+                'is_available': True,
+                'created_at': now - timedelta(minutes=product_id),
+                'updated_at': now,
+            }
+            for product_id in range(1, products + 1)
+        ]
+        images_by_product = {
+            row['id']: service._generate_presigned_urls([f"{row['id']}/image_{index}.jpg" for index in range(3)])
+            for row in rows
+        }
+        context = {'request': Request(APIRequestFactory().get('/api/products/'))}
+
+        def serializer_path():
+            # Model instances stand in for what the ORM builds from the same rows
+            instances = [AmigurumiProduct(**row) for row in rows]
+            data = AmigurumiProductSerializer(instances, many=True, context=dict(context)).data
+            return JSONRenderer().render({'next': None, 'previous': None, 'results': data})
+
+        def values_path():
+            data = serialize_product_rows(rows, context)
+            return ORJSONRenderer().render({'next': None, 'previous': None, 'results': data})
+
+        with mock.patch.object(S3ImageService, 'get_images_for_products', return_value=images_by_product):
+            if serializer_path() != values_path():
+                raise CommandError('values() + orjson output differs from ModelSerializer + JSONRenderer')
+            self.stdout.write(self.style.SUCCESS('values() + orjson output matches ModelSerializer + JSONRenderer'))
+            self.stdout.write(
+                f'Rendering a page of {products} products with 3 images each, {iterations} iterations '
+                f'(database query and image cache excluded)'
+            )
+
+            for label, func in (
+                ('ModelSerializer + JSONRenderer', serializer_path),
+                ('values() + orjson', values_path),
+            ):
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    func()
+                elapsed = time.perf_counter() - start
+                self._report(label, elapsed, iterations)
+                self.stdout.write(f'{"":<40} {iterations / elapsed:10.1f} requests/s')
+
+    def _bench_async_views(self, options):
+        """Compare tail latency of the sync and async list views under simulated S3 latency"""
+        products = options['products']
+        iterations = options['iterations']
+        concurrency = options['concurrency']
+        latency = options['s3_latency'] / 1000
+        if not AmigurumiProduct.objects.filter(is_available=True).exists():
+            raise CommandError('No available products to list')
+
+        # force_refresh skips the response cache and rebuilds every image entry
+        path = f'/api/products/?page_size={products}&force_refresh=true'
+        rebuild = S3ImageService._rebuild_product_images
+
+        def slow_rebuild(service, *args, **kwargs):
+            time.sleep(latency)
+            return rebuild(service, *args, **kwargs)
+
+        def timed_sync_request(client):
+            start = time.perf_counter()
+            response = client.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'Sync view returned {response.status_code}')
+            return time.perf_counter() - start
+
+        async def timed_async_request(client, slots):
+            async with slots:
+                start = time.perf_counter()
+                response = await client.get(path.replace('/api/', '/api/async/'))
+                if response.status_code != 200:
+                    raise CommandError(f'Async view returned {response.status_code}')
+                return time.perf_counter() - start
+
+        async def run_async():
+            # Warm up the client and thread pools outside the timed requests
+            await AsyncClient().get(path.replace('/api/', '/api/async/'))
+            slots = asyncio.Semaphore(concurrency)
+            client = AsyncClient()
+            start = time.perf_counter()
+            latencies = await asyncio.gather(*(timed_async_request(client, slots) for _ in range(iterations)))
+            return latencies, time.perf_counter() - start
+
+        # Give both paths the same number of image threads: each sync request
+        # starts its own pool of S3_IMAGE_FETCH_WORKERS, the async views share one
+        image_threads = concurrency * S3ImageService().fetch_workers
+        services._async_fetch_executors.clear()
+
+        self.stdout.write(
+            f'{iterations} list requests of {products} products, {concurrency} in flight, '
+            f'{options["s3_latency"]:.0f} ms simulated S3 latency per product, {image_threads} image threads'
+        )
+        with mock.patch.object(S3ImageService, '_rebuild_product_images', slow_rebuild), \
+                override_settings(S3_IMAGE_ASYNC_FETCH_THREADS=image_threads):
+            # Sync views: one thread per in-flight request, as gunicorn threads would
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                timed_sync_request(Client())
+                start = time.perf_counter()
+                sync_latencies = list(executor.map(lambda _: timed_sync_request(Client()), range(iterations)))
+                sync_elapsed = time.perf_counter() - start
+
+            async_latencies, async_elapsed = asyncio.run(run_async())
+        services._async_fetch_executors.clear()
+
+        for label, latencies, elapsed in (
+            ('sync views', sync_latencies, sync_elapsed),
+            ('async views', async_latencies, async_elapsed),
+        ):
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(
+                f'{label:<14} p50 {quantiles[49] * 1000:8.1f} ms   p95 {quantiles[94] * 1000:8.1f} ms   '
+                f'p99 {quantiles[98] * 1000:8.1f} ms   {iterations / elapsed:7.1f} requests/s'
+            )
+
+    def _floor_expiry(self, images):
+        """Images as the compact layout stores them: one expiry, in whole seconds"""
+        min_expires_at = services._get_min_expires_at(images)
+        expires_at = datetime.fromtimestamp(min_expires_at) if min_expires_at is not None else None
+        return [{**image, 'expires_at': expires_at} for image in images]
@@ -0,0 +1,94 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from products.models import AmigurumiProduct
+from products.pagination import ProductCursorPagination
+from decimal import Decimal
+import random
+import time
+
+SYNTHETIC_PREFIX = '[synthetic] '
+
+
+class Command(BaseCommand):
+    help = 'Seed a synthetic catalog and check that the catalog queries use indexes (PostgreSQL only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Number of synthetic products to create before explaining'
+        )
+        parser.add_argument(
+            '--cleanup',
+            action='store_true',
+            help='Delete synthetic products when done'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per bulk insert when seeding'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(f'This command needs PostgreSQL, the default database is {connection.vendor}')
+
+        if options['seed']:
+            self._seed(options['seed'], options['batch_size'])
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {AmigurumiProduct._meta.db_table}')
+
+        failures = []
+        for label, queryset in self._catalog_queries():
+            start = time.perf_counter()
+            plan = queryset.explain(analyze=True)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+
+            uses_index = 'Index Scan' in plan or 'Index Only Scan' in plan
+            status = self.style.SUCCESS('index') if uses_index else self.style.ERROR('NO INDEX')
+            self.stdout.write(f'{label:<30} {status:<10} {elapsed_ms:8.2f} ms')
+            if options['verbosity'] > 1 or not uses_index:
+                self.stdout.write(plan)
+            if not uses_index:
+                failures.append(label)
+
+        if options['cleanup']:
+            deleted, _ = AmigurumiProduct.objects.filter(name__startswith=SYNTHETIC_PREFIX).delete()
+            self.stdout.write(f'Deleted {deleted} synthetic products')
+
+        if failures:
+            raise CommandError(f'Queries not using an index: {", ".join(failures)}')
+
+    def _catalog_queries(self):
+        """Querysets matching the first page of each catalog endpoint"""
+        page_size = ProductCursorPagination.page_size + 1
+        available = AmigurumiProduct.objects.filter(is_available=True)
+        return [
+            ('product list', available.order_by('-created_at')[:page_size]),
+            ('featured products', available.filter(is_featured=True).order_by('-created_at')[:page_size]),
+            ('products by category', available.filter(category='DOLL').order_by('-created_at')[:page_size]),
+        ]
+
+    def _seed(self, count: int, batch_size: int):
+        """Bulk insert synthetic products with a realistic mix of flags and categories"""
+        categories = [choice for choice, _ in AmigurumiProduct.CATEGORY_CHOICES]
+        self.stdout.write(f'Seeding {count} synthetic products...')
+        start = time.perf_counter()
+
+        for offset in range(0, count, batch_size):
+            AmigurumiProduct.objects.bulk_create([
+                AmigurumiProduct(
+                    name=f'{SYNTHETIC_PREFIX}Product {offset + index}',
+                    description='Synthetic product used to benchmark catalog queries. ' * 5,
+                    price=Decimal(random.randint(500, 10000)) / 100,
+                    category=random.choice(categories),
+                    is_featured=random.random() < 0.05,
+                    is_available=random.random() < 0.9,
+                )
+                for index in range(min(batch_size, count - offset))
+            ])
+
+        self.stdout.write(f'Seeded {count} products in {time.perf_counter() - start:.1f}s')
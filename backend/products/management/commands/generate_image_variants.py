@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from products.models import ProductImage
+from products.services import S3ImageService
+from io import BytesIO
+
+
+class Command(BaseCommand):
+    help = 'Generate resized variants, placeholders and dimensions for images already in S3 (new uploads get them automatically)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product-id',
+            type=int,
+            help='Only generate variants for this product'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Regenerate images that already have variants and a placeholder'
+        )
+
+    def handle(self, *args, **options):
+        s3_service = S3ImageService()
+        records = ProductImage.objects.all()
+        if options['product_id']:
+            records = records.filter(product_id=options['product_id'])
+        if not options['force']:
+            records = records.filter(Q(variants={}) | Q(placeholder='') | Q(width__isnull=True))
+
+        generated = 0
+        failed = 0
+        touched_products = set()
+        for record in records.iterator():
+            try:
+                response = s3_service.s3_client.get_object(Bucket=s3_service.bucket_name, Key=record.key)
+                image_file = BytesIO(response['Body'].read())
+            except Exception as e:
+                self.stdout.write(f'✗ Could not download {record.key}: {e}')
+                failed += 1
+                continue
+
+            record.width, record.height = s3_service._read_image_dimensions(image_file)
+            record.placeholder = s3_service._render_placeholder(image_file)
+            record.variants = s3_service.upload_image_variants(record.key, image_file)
+            if record.width is None or (s3_service.variants and not record.variants):
+                self.stdout.write(f'✗ Could not generate variants for {record.key}')
+                failed += 1
+                continue
+
+            record.save(update_fields=['width', 'height', 'placeholder', 'variants', 'updated_at'])
+            touched_products.add(record.product_id)
+            generated += 1
+            self.stdout.write(f'✓ {record.key}: {record.width}x{record.height}, {", ".join(record.variants) or "no variants"}')
+
+        for product_id in touched_products:
+            s3_service.invalidate_product_cache(product_id)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Variants generated! Success: {generated}, Failed: {failed}')
+        )
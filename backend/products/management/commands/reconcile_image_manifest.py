@@ -0,0 +1,106 @@
+from django.core.management.base import BaseCommand
+from products.models import AmigurumiProduct, ProductImage
+from products.services import S3ImageService
+from collections import defaultdict
+
+
+class Command(BaseCommand):
+    help = 'Compare the ProductImage manifest with S3 and optionally fix the differences'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product-id',
+            type=int,
+            help='Only reconcile this product (default: the whole bucket)'
+        )
+        parser.add_argument(
+            '--apply',
+            action='store_true',
+            help='Write the changes to the manifest (default: report only)'
+        )
+
+    def handle(self, *args, **options):
+        s3_service = S3ImageService()
+        product_id = options['product_id']
+
+        # One paginated listing for the whole bucket (or a single prefix)
+        prefix = f'{product_id}/' if product_id else ''
+        s3_objects = defaultdict(dict)
+        for obj in s3_service._iter_objects(prefix):
+            product_prefix, separator, _ = obj['Key'].partition('/')
+            if separator and product_prefix.isdigit():
+                s3_objects[int(product_prefix)][obj['Key']] = obj
+
+        manifest = ProductImage.objects.all()
+        if product_id:
+            manifest = manifest.filter(product_id=product_id)
+        records = defaultdict(dict)
+        for record in manifest:
+            records[record.product_id][record.key] = record
+
+        existing_products = set(
+            AmigurumiProduct.objects.filter(id__in=set(s3_objects) | set(records)).values_list('id', flat=True)
+        )
+
+        missing, changed, stale, orphaned = [], [], [], []
+        for pid in sorted(set(s3_objects) | set(records)):
+            objects = s3_objects.get(pid, {})
+            product_records = records.get(pid, {})
+
+            if pid not in existing_products:
+                orphaned.extend(objects)
+                continue
+
+            for key, obj in objects.items():
+                record = product_records.get(key)
+                etag = obj['ETag'].strip('"')
+                if record is None:
+                    missing.append((pid, obj))
+                elif record.size != obj['Size'] or record.etag != etag:
+                    changed.append((pid, obj))
+            stale.extend(record for key, record in product_records.items() if key not in objects)
+
+        for label, items in [
+            ('Missing from manifest', [obj['Key'] for _, obj in missing]),
+            ('Changed in S3', [obj['Key'] for _, obj in changed]),
+            ('No longer in S3', [record.key for record in stale]),
+            ('In S3 without a product', orphaned),
+        ]:
+            self.stdout.write(f'{label}: {len(items)}')
+            for key in items:
+                self.stdout.write(f'  {key}')
+
+        if not options['apply']:
+            if missing or changed or stale:
+                self.stdout.write(self.style.WARNING('Dry run, use --apply to update the manifest'))
+            else:
+                self.stdout.write(self.style.SUCCESS('Manifest is in sync with S3'))
+            return
+
+        # Variants, placeholder and dimensions of a changed image describe the
+        # old content; clearing them lets generate_image_variants redo them
+        derived_fields = {'variants': {}, 'placeholder': '', 'width': None, 'height': None}
+        touched_products = set()
+        for pid, obj in sorted(missing, key=lambda item: item[1]['Key']):
+            s3_service.record_product_image(pid, obj['Key'], size=obj['Size'], etag=obj['ETag'].strip('"'))
+            touched_products.add(pid)
+        for pid, obj in sorted(changed, key=lambda item: item[1]['Key']):
+            s3_service.record_product_image(
+                pid, obj['Key'], size=obj['Size'], etag=obj['ETag'].strip('"'), **derived_fields
+            )
+            touched_products.add(pid)
+
+        if stale:
+            ProductImage.objects.filter(id__in=[record.id for record in stale]).delete()
+            touched_products.update(record.product_id for record in stale)
+
+        for pid in touched_products:
+            s3_service.invalidate_product_cache(pid)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Manifest updated! Added: {len(missing)}, Updated: {len(changed)}, Removed: {len(stale)}'
+            )
+        )
+        if missing or changed:
+            self.stdout.write('Run generate_image_variants to add variants for the added and updated images')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from products.models import AmigurumiProduct, get_search_vector
+
+
+class Command(BaseCommand):
+    help = 'Rebuild product search vectors (after bulk updates or a PRODUCTS_SEARCH_CONFIG change)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--product-id',
+            type=int,
+            help='Only rebuild the vector of this product'
+        )
+
+    def handle(self, *args, **options):
+        products = AmigurumiProduct.objects.all()
+        if options['product_id']:
+            products = products.filter(pk=options['product_id'])
+
+        updated = products.update(search_vector=get_search_vector())
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Search vectors rebuilt for {updated} products')
+        )
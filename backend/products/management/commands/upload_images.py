@@ -1,9 +1,15 @@
 from django.core.management.base import BaseCommand
-from django.core.files.storage import default_storage
+from django.db import close_old_connections
 from products.models import AmigurumiProduct
 from products.services import S3ImageService
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
 import os
-import glob
+import threading
+import time
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
 
 class Command(BaseCommand):
     help = 'Upload product images to S3 and clear image cache'
@@ -19,6 +25,22 @@ class Command(BaseCommand):
             type=str,
             help='Directory containing images to upload'
         )
+        parser.add_argument(
+            '--root-dir',
+            type=str,
+            help='Directory with one sub-directory of images per product, laid out as <root>/<product_id>/*.jpg'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Number of files uploaded concurrently (default: 8)'
+        )
+        parser.add_argument(
+            '--manifest',
+            type=str,
+            help='Resume file recording completed uploads; files already listed there are skipped'
+        )
         parser.add_argument(
             '--clear-cache',
             action='store_true',
@@ -30,80 +52,188 @@ class Command(BaseCommand):
 
         if options['clear_cache']:
             self.stdout.write('Clearing image cache for all products...')
-            products = AmigurumiProduct.objects.all()
-            for product in products:
-                product.invalidate_image_cache()
+            for product_id in AmigurumiProduct.objects.values_list('id', flat=True).iterator():
+                s3_service.invalidate_product_cache(product_id)
             self.stdout.write(
                 self.style.SUCCESS('Successfully cleared cache for all products')
             )
             return
 
         if options['product_id'] and options['image_dir']:
-            product_id = options['product_id']
-            image_dir = options['image_dir']
-            
-            try:
-                product = AmigurumiProduct.objects.get(id=product_id)
-            except AmigurumiProduct.DoesNotExist:
-                self.stdout.write(
-                    self.style.ERROR(f'Product with ID {product_id} does not exist')
-                )
+            image_dirs = {options['product_id']: options['image_dir']}
+        elif options['root_dir']:
+            image_dirs = self._find_product_dirs(options['root_dir'])
+            if image_dirs is None:
                 return
+        else:
+            self.stdout.write(
+                self.style.ERROR(
+                    'Please provide both --product-id and --image-dir, --root-dir, or use --clear-cache'
+                )
+            )
+            return
 
-            if not os.path.exists(image_dir):
+        existing_ids = set(
+            AmigurumiProduct.objects.filter(id__in=image_dirs).values_list('id', flat=True)
+        )
+        for product_id in sorted(set(image_dirs) - existing_ids):
+            self.stdout.write(
+                self.style.ERROR(f'Product with ID {product_id} does not exist')
+            )
+            del image_dirs[product_id]
+
+        completed = self._load_manifest(options['manifest'])
+        uploads = []
+        skipped = 0
+
+        for product_id, image_dir in sorted(image_dirs.items()):
+            if not os.path.isdir(image_dir):
                 self.stdout.write(
                     self.style.ERROR(f'Directory {image_dir} does not exist')
                 )
-                return
-
-            # Find all image files in the directory
-            image_extensions = ['*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp']
-            image_files = []
-            
-            for extension in image_extensions:
-                pattern = os.path.join(image_dir, extension)
-                image_files.extend(glob.glob(pattern))
-                # Also check uppercase extensions
-                pattern = os.path.join(image_dir, extension.upper())
-                image_files.extend(glob.glob(pattern))
+                continue
 
+            image_files = self._find_image_files(image_dir)
             if not image_files:
                 self.stdout.write(
                     self.style.WARNING(f'No image files found in {image_dir}')
                 )
-                return
+                continue
 
             self.stdout.write(
-                f'Found {len(image_files)} image files for product {product.name}'
+                f'Found {len(image_files)} image files for product {product_id}'
             )
+            # Display order follows the sorted file names, not upload completion
+            for position, image_path in enumerate(image_files):
+                stat = os.stat(image_path)
+                manifest_key = f'{product_id}/{os.path.basename(image_path)}'
+                if completed.get(manifest_key) == [stat.st_size, stat.st_mtime]:
+                    skipped += 1
+                    continue
+                uploads.append((product_id, image_path, stat, position))
 
-            successful_uploads = 0
-            failed_uploads = 0
+        if not uploads:
+            self.stdout.write(
+                self.style.SUCCESS(f'Nothing to upload ({skipped} files already uploaded)')
+            )
+            return
 
-            for image_path in image_files:
-                filename = os.path.basename(image_path)
-                
-                try:
-                    with open(image_path, 'rb') as image_file:
-                        if s3_service.upload_product_image(product_id, image_file, filename):
-                            successful_uploads += 1
-                            self.stdout.write(f'✓ Uploaded: {filename}')
-                        else:
-                            failed_uploads += 1
-                            self.stdout.write(f'✗ Failed: {filename}')
-                except Exception as e:
-                    failed_uploads += 1
-                    self.stdout.write(f'✗ Error with {filename}: {str(e)}')
+        self._upload_all(s3_service, uploads, skipped, options)
 
+    def _find_product_dirs(self, root_dir: str):
+        """Map product IDs to the numeric sub-directories of root_dir"""
+        if not os.path.isdir(root_dir):
             self.stdout.write(
-                self.style.SUCCESS(
-                    f'Upload complete! Success: {successful_uploads}, Failed: {failed_uploads}'
-                )
+                self.style.ERROR(f'Directory {root_dir} does not exist')
             )
+            return None
 
-        else:
+        return {
+            int(entry.name): entry.path
+            for entry in os.scandir(root_dir)
+            if entry.is_dir() and entry.name.isdigit()
+        }
+
+    def _find_image_files(self, image_dir: str):
+        """List image files in a directory with a single scan, any extension case"""
+        return sorted(
+            entry.path
+            for entry in os.scandir(image_dir)
+            if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS
+        )
+
+    def _load_manifest(self, manifest_path):
+        """Read completed uploads from a JSON-lines resume file"""
+        completed = {}
+        if not manifest_path or not os.path.exists(manifest_path):
+            return completed
+
+        with open(manifest_path) as manifest_file:
+            for line in manifest_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # Partially written last line from an interrupted run
+                    continue
+                completed[entry['key']] = [entry['size'], entry['mtime']]
+        return completed
+
+    def _upload_all(self, s3_service, uploads, skipped, options):
+        total = len(uploads)
+        total_bytes = sum(stat.st_size for _, _, stat, _ in uploads)
+        self.stdout.write(
+            f'Uploading {total} files ({total_bytes / 1024 / 1024:.1f} MB) with {options["workers"]} workers...'
+        )
+
+        manifest_file = open(options['manifest'], 'a') if options['manifest'] else None
+        manifest_lock = threading.Lock()
+
+        def upload(product_id, image_path, stat, position):
+            filename = os.path.basename(image_path)
+            try:
+                with open(image_path, 'rb') as image_file:
+                    uploaded = s3_service.upload_product_image(
+                        product_id, image_file, filename, invalidate=False, position=position
+                    )
+                if uploaded and manifest_file:
+                    with manifest_lock:
+                        manifest_file.write(json.dumps({
+                            'key': f'{product_id}/{filename}',
+                            'size': stat.st_size,
+                            'mtime': stat.st_mtime,
+                        }) + '\n')
+                        manifest_file.flush()
+                return uploaded, None
+            except Exception as e:
+                return False, str(e)
+            finally:
+                # Worker threads open their own DB connection for the manifest
+                close_old_connections()
+
+        successful_uploads = 0
+        failed_uploads = 0
+        uploaded_bytes = 0
+        uploaded_products = set()
+        start = time.perf_counter()
+
+        try:
+            with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+                futures = {
+                    executor.submit(upload, *upload_args): upload_args
+                    for upload_args in uploads
+                }
+                for done, future in enumerate(as_completed(futures), start=1):
+                    product_id, image_path, stat, _ = futures[future]
+                    filename = os.path.basename(image_path)
+                    uploaded, error = future.result()
+                    if uploaded:
+                        successful_uploads += 1
+                        uploaded_bytes += stat.st_size
+                        uploaded_products.add(product_id)
+                        self.stdout.write(f'✓ [{done}/{total}] Uploaded: {product_id}/{filename}')
+                    elif error:
+                        failed_uploads += 1
+                        self.stdout.write(f'✗ [{done}/{total}] Error with {product_id}/{filename}: {error}')
+                    else:
+                        failed_uploads += 1
+                        self.stdout.write(f'✗ [{done}/{total}] Failed: {product_id}/{filename}')
+        finally:
+            if manifest_file:
+                manifest_file.close()
+
+            # Invalidate each product's cache once, after all of its files
+            for product_id in uploaded_products:
+                s3_service.invalidate_product_cache(product_id)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Upload complete! Success: {successful_uploads}, Failed: {failed_uploads}, '
+                f'Skipped: {skipped}'
+            )
+        )
+        if elapsed:
             self.stdout.write(
-                self.style.ERROR(
-                    'Please provide both --product-id and --image-dir, or use --clear-cache'
-                )
+                f'{successful_uploads / elapsed:.1f} files/s, '
+                f'{uploaded_bytes / 1024 / 1024 / elapsed:.2f} MB/s in {elapsed:.1f}s'
             )
@@ -0,0 +1,90 @@
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from products.models import AmigurumiProduct
+from products.services import S3ImageService
+import time
+
+
+class Command(BaseCommand):
+    help = 'Pre-sign and cache images for the whole catalog'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Products resolved and written to the cache per batch'
+        )
+        parser.add_argument(
+            '--available-only',
+            action='store_true',
+            help='Only warm products that are available in the store'
+        )
+        parser.add_argument(
+            '--bucket-listing',
+            action='store_true',
+            help='With S3_IMAGE_SOURCE=s3, list the bucket once instead of once per product'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running and re-warm every --interval seconds'
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            help='Seconds between runs with --loop (default: just before cached URLs need a refresh)'
+        )
+
+    def handle(self, *args, **options):
+        s3_service = S3ImageService()
+        interval = options['interval']
+        if interval is None:
+            # Re-sign a minute before entries enter the refresh buffer
+            interval = max(s3_service.presigned_url_expiration - s3_service.refresh_buffer - 60, 60)
+
+        while True:
+            self._warm(s3_service, options)
+            if not options['loop']:
+                return
+            close_old_connections()
+            self.stdout.write(f'Next run in {interval}s')
+            time.sleep(interval)
+
+    def _warm(self, s3_service, options):
+        products = AmigurumiProduct.objects.all()
+        if options['available_only']:
+            products = products.filter(is_available=True)
+        product_ids = products.order_by('id').values_list('id', flat=True).iterator(chunk_size=options['batch_size'])
+
+        image_keys_by_product = None
+        if options['bucket_listing'] and s3_service.image_source == 's3':
+            self.stdout.write('Listing the whole bucket...')
+            image_keys_by_product = s3_service.list_all_product_images()
+
+        self.stdout.write('Warming image cache...')
+        start = time.perf_counter()
+        warmed = 0
+        batch = []
+
+        for product_id in product_ids:
+            batch.append(product_id)
+            if len(batch) >= options['batch_size']:
+                warmed += self._warm_batch(s3_service, batch, image_keys_by_product, start, warmed)
+                batch = []
+        if batch:
+            warmed += self._warm_batch(s3_service, batch, image_keys_by_product, start, warmed)
+
+        elapsed = time.perf_counter() - start
+        rate = warmed / elapsed if elapsed else 0
+        self.stdout.write(
+            self.style.SUCCESS(f'Warmed {warmed} products in {elapsed:.2f}s ({rate:.1f} products/s)')
+        )
+
+    def _warm_batch(self, s3_service, batch, image_keys_by_product, start, warmed) -> int:
+        written = s3_service.warm_product_images(batch, image_keys_by_product)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f'  {warmed + written} products cached ({(warmed + written) / elapsed:.1f} products/s)'
+        )
+        return written
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_remove_image_s3_path_field'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=models.Index(fields=['is_available', '-created_at'], name='product_available_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=models.Index(fields=['is_available', 'category', '-created_at'], name='product_avail_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_featured', True)), fields=['-created_at'], name='product_featured_created_idx'),
+        ),
+    ]
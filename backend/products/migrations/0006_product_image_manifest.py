@@ -0,0 +1,35 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_catalog_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(help_text='S3 object key', max_length=500, unique=True)),
+                ('filename', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='Object size in bytes')),
+                ('etag', models.CharField(blank=True, max_length=100)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('width', models.PositiveIntegerField(blank=True, null=True)),
+                ('height', models.PositiveIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='image_records', to='products.amigurumiproduct')),
+            ],
+            options={
+                'ordering': ['product', 'position', 'key'],
+                'indexes': [models.Index(fields=['product', 'position'], name='product_image_position_idx')],
+            },
+        ),
+    ]
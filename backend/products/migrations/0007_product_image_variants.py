@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_image_manifest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='variants',
+            field=models.JSONField(blank=True, default=dict, help_text='Resized copies by name: {"card": {"key", "width", "height", "size", "content_type"}}'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productimage',
+            name='placeholder',
+            field=models.TextField(blank=True, help_text='Tiny base64 data URI preview shown while the image loads'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-17 11:52
+
+from django.conf import settings
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations
+
+
+def populate_search_vectors(apps, schema_editor):
+    """Fill search_vector for existing products; new saves keep it current"""
+    from django.contrib.postgres.search import SearchVector
+
+    AmigurumiProduct = apps.get_model('products', 'AmigurumiProduct')
+    config = getattr(settings, 'PRODUCTS_SEARCH_CONFIG', 'english')
+    AmigurumiProduct.objects.update(
+        search_vector=(
+            SearchVector('name', weight='A', config=config)
+            + SearchVector('description', weight='B', config=config)
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_product_image_placeholder'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amigurumiproduct',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, help_text='Weighted name/description document, refreshed on save', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ),
+        migrations.RunPython(populate_search_vectors, migrations.RunPython.noop),
+    ]
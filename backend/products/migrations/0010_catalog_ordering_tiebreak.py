@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-17 12:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='amigurumiproduct',
+            options={'ordering': ['-created_at', '-id']},
+        ),
+        migrations.RemoveIndex(
+            model_name='amigurumiproduct',
+            name='product_available_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='amigurumiproduct',
+            name='product_avail_cat_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='amigurumiproduct',
+            name='product_featured_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=models.Index(fields=['is_available', '-created_at', '-id'], name='product_available_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=models.Index(fields=['is_available', 'category', '-created_at', '-id'], name='product_avail_cat_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='amigurumiproduct',
+            index=models.Index(condition=models.Q(('is_available', True), ('is_featured', True)), fields=['-created_at', '-id'], name='product_featured_created_idx'),
+        ),
+    ]
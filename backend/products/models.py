@@ -1,6 +1,23 @@
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 from django.utils.functional import cached_property
 
+
+def get_search_vector():
+    """
+    Build the search document of a product: name (weight A) ranks above description (weight B)
+
+    Used to fill AmigurumiProduct.search_vector with QuerySet.update().
+    """
+    config = getattr(settings, 'PRODUCTS_SEARCH_CONFIG', 'english')
+    return (
+        SearchVector('name', weight='A', config=config)
+        + SearchVector('description', weight='B', config=config)
+    )
+
+
 class AmigurumiProduct(models.Model):
     """Model for Amigurumi products"""
     
@@ -20,9 +37,28 @@ class AmigurumiProduct(models.Model):
     is_available = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text='Weighted name/description document, refreshed on save'
+    )
     
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Product list and cursor pagination: available products, newest first
+            models.Index(fields=['is_available', '-created_at', '-id'], name='product_available_created_idx'),
+            # Category listing
+            models.Index(fields=['is_available', 'category', '-created_at', '-id'], name='product_avail_cat_created_idx'),
+            # Featured listing only ever reads featured, available rows
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='product_featured_created_idx',
+                condition=models.Q(is_featured=True, is_available=True),
+            ),
+            # Full-text search
+            GinIndex(fields=['search_vector'], name='product_search_vector_idx'),
+        ]
     
     def __str__(self):
         return self.name
@@ -57,7 +93,7 @@ class AmigurumiProduct(models.Model):
         Args:
             force_refresh: If True, bypass cache and fetch fresh data from S3
         """
-        images = self.get_images(force_refresh=force_refresh)
+        images = self.get_images(force_refresh=True) if force_refresh else self.images
         if images:
             return images[0]
         return None
@@ -75,5 +111,35 @@ class AmigurumiProduct(models.Model):
         service.invalidate_product_cache(self.id)
         
         # Also clear the cached_property
-        if hasattr(self, '_images'):
-            delattr(self, '_images')
+        self.__dict__.pop('images', None)
+
+
+class ProductImage(models.Model):
+    """Manifest of the images stored in S3 for a product"""
+    
+    product = models.ForeignKey(AmigurumiProduct, on_delete=models.CASCADE, related_name='image_records')
+    key = models.CharField(max_length=500, unique=True, help_text='S3 object key')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0, help_text='Object size in bytes')
+    etag = models.CharField(max_length=100, blank=True)
+    content_type = models.CharField(max_length=100, blank=True)
+    position = models.PositiveIntegerField(default=0)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    placeholder = models.TextField(blank=True, help_text='Tiny base64 data URI preview shown while the image loads')
+    variants = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text='Resized copies by name: {"card": {"key", "width", "height", "size", "content_type"}}'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['product', 'position', 'key']
+        indexes = [
+            models.Index(fields=['product', 'position'], name='product_image_position_idx'),
+        ]
+    
+    def __str__(self):
+        return self.key
@@ -0,0 +1,18 @@
+from django.conf import settings
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class ProductCursorPagination(CursorPagination):
+    """Cursor pagination over products, newest first"""
+    # The id tie-breaker keeps products with equal timestamps in a fixed order
+    ordering = ('-created_at', '-id')
+    page_size = getattr(settings, 'PRODUCTS_PAGE_SIZE', 24)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PRODUCTS_MAX_PAGE_SIZE', 100)
+
+
+class ProductSearchPagination(PageNumberPagination):
+    """Page number pagination for ranked search results, which have no stable cursor"""
+    page_size = getattr(settings, 'PRODUCTS_PAGE_SIZE', 24)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PRODUCTS_MAX_PAGE_SIZE', 100)
@@ -0,0 +1,59 @@
+import datetime
+import decimal
+import orjson
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import JSONRenderer
+
+
+def _default(obj):
+    """Encode the types orjson has no native support for, the way DRF's JSONEncoder does"""
+    if isinstance(obj, Promise):
+        return force_str(obj)
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return str(obj.total_seconds())
+    if isinstance(obj, bytes):
+        return obj.decode()
+    if hasattr(obj, 'tolist'):
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return dict(obj)
+        except Exception:
+            pass
+    if hasattr(obj, '__iter__'):
+        return tuple(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson
+
+    Produces the same bytes as DRF's JSONRenderer with its default settings
+    (compact, unescaped unicode, UTC datetimes ending in ``Z``), several
+    times faster for large product pages. orjson only supports an indent of
+    2, so any requested indent renders with 2 spaces.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """
+        Render `data` into JSON, returning a bytestring.
+        """
+        if data is None:
+            return b''
+
+        options = self.options
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            options |= orjson.OPT_INDENT_2
+
+        ret = orjson.dumps(data, default=_default, option=options)
+
+        # Escape \u2028 and \u2029 like JSONRenderer, so the output stays a
+        # strict javascript subset
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
@@ -0,0 +1,107 @@
+from decimal import Decimal
+from typing import List, Optional, Tuple
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F, Max, Min, Q
+from .models import AmigurumiProduct
+
+PRICE_QUANTUM = Decimal('0.01')
+
+
+def _format_price(value: Optional[Decimal]) -> Optional[str]:
+    """Format a price like the product serializers do"""
+    return None if value is None else f'{value.quantize(PRICE_QUANTUM):f}'
+
+
+def _or_none(condition: Q) -> Optional[Q]:
+    """Aggregate filters must be None rather than an empty Q"""
+    return condition if condition else None
+
+
+class ProductSearch:
+    """
+    Full-text product search with category and price facets
+
+    Matches are ranked with the search_vector column (GIN-indexed, refreshed
+    on save). Facets follow the usual convention: each facet counts the
+    matches filtered by every other facet but not by itself, so the
+    category facet still lists other categories once one is selected. All
+    facet counts come from a single aggregate query.
+    """
+
+    def __init__(self, query: str = '', category: Optional[str] = None,
+                 min_price: Optional[Decimal] = None, max_price: Optional[Decimal] = None):
+        self.config = getattr(settings, 'PRODUCTS_SEARCH_CONFIG', 'english')
+        self.price_buckets = getattr(settings, 'PRODUCTS_SEARCH_PRICE_BUCKETS', [10, 25, 50])
+
+        self.search_query = None
+        self.matches = AmigurumiProduct.objects.filter(is_available=True)
+        if query:
+            self.search_query = SearchQuery(query, search_type='websearch', config=self.config)
+            self.matches = self.matches.filter(search_vector=self.search_query)
+
+        self.category_filter = Q(category=category) if category else Q()
+        self.price_filter = Q()
+        if min_price is not None:
+            self.price_filter &= Q(price__gte=min_price)
+        if max_price is not None:
+            self.price_filter &= Q(price__lte=max_price)
+
+    def get_results(self):
+        """
+        Get the filtered matches, best first
+
+        Returns:
+            QuerySet ordered by rank (newest first when there is no query)
+        """
+        results = self.matches.filter(self.category_filter & self.price_filter)
+        if self.search_query is None:
+            return results.order_by('-created_at', '-id')
+        return results.annotate(
+            rank=SearchRank(F('search_vector'), self.search_query)
+        ).order_by('-rank', '-created_at', '-id')
+
+    def _get_price_buckets(self) -> List[Tuple[Optional[Decimal], Optional[Decimal]]]:
+        """Return (low, high) bounds of each price bucket; low is inclusive, high exclusive"""
+        edges = [None] + [Decimal(bound) for bound in sorted(self.price_buckets)] + [None]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def get_facets(self) -> dict:
+        """
+        Count matches per category and price bucket in one query
+
+        Returns:
+            Dictionary with ``category`` and ``price`` bucket lists and the
+            ``price_range`` of the matches in the selected category
+        """
+        buckets = self._get_price_buckets()
+        aggregates = {
+            'min_price': Min('price', filter=_or_none(self.category_filter)),
+            'max_price': Max('price', filter=_or_none(self.category_filter)),
+        }
+        for code, _ in AmigurumiProduct.CATEGORY_CHOICES:
+            aggregates[f'category_{code}'] = Count('id', filter=Q(category=code) & self.price_filter)
+        for index, (low, high) in enumerate(buckets):
+            bucket_filter = self.category_filter
+            if low is not None:
+                bucket_filter &= Q(price__gte=low)
+            if high is not None:
+                bucket_filter &= Q(price__lt=high)
+            aggregates[f'price_{index}'] = Count('id', filter=_or_none(bucket_filter))
+
+        counts = self.matches.order_by().aggregate(**aggregates)
+
+        return {
+            'category': [
+                {'value': code, 'label': label, 'count': counts[f'category_{code}']}
+                for code, label in AmigurumiProduct.CATEGORY_CHOICES
+            ],
+            'price': [
+                {'min': _format_price(low), 'max': _format_price(high), 'count': counts[f'price_{index}']}
+                for index, (low, high) in enumerate(buckets)
+            ],
+            'price_range': {
+                'min': _format_price(counts['min_price']),
+                'max': _format_price(counts['max_price']),
+            },
+        }
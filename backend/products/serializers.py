@@ -1,36 +1,255 @@
+from functools import partial
+from typing import Iterable, List, Optional
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
 from rest_framework import serializers
 from .models import AmigurumiProduct
+from .services import S3ImageService
+
+
+IMAGE_FIELDS = ('images', 'primary_image')
+PRODUCT_FIELDS = (
+    'id', 'name', 'description', 'price', 'category',
+    'images', 'primary_image', 'is_featured', 'is_available',
+    'created_at', 'updated_at'
+)
+# Fields ?expand= can add on top of a ?fields= selection
+EXPANDABLE_FIELDS = ('images',)
+
+
+def _get_query_list(context, name: str) -> Optional[List[str]]:
+    """Parse a comma-separated query parameter into a list, if present"""
+    request = context.get('request')
+    if request is None or name not in request.query_params:
+        return None
+    return [value.strip() for value in request.query_params[name].split(',') if value.strip()]
+
+
+def _get_selected_fields(context) -> List[str]:
+    """
+    Return the product fields to output, in order, honouring ?fields= and ?expand=
+
+    Raises:
+        serializers.ValidationError: If either parameter names an unknown field
+    """
+    requested = _get_query_list(context, 'fields')
+    expand = _get_query_list(context, 'expand') or []
+
+    errors = {}
+    unknown = [field_name for field_name in requested or [] if field_name not in PRODUCT_FIELDS]
+    if unknown:
+        errors['fields'] = [f'Unknown field "{field_name}".' for field_name in unknown]
+    unknown = [field_name for field_name in expand if field_name not in EXPANDABLE_FIELDS]
+    if unknown:
+        errors['expand'] = [f'"{field_name}" cannot be expanded.' for field_name in unknown]
+    if errors:
+        raise serializers.ValidationError(errors)
+
+    if requested is None:
+        return list(PRODUCT_FIELDS)
+    return [field_name for field_name in PRODUCT_FIELDS if field_name in requested or field_name in expand]
+
+
+def _get_force_refresh(context) -> bool:
+    """Check if force_refresh parameter was passed in the request"""
+    request = context.get('request')
+    if request and request.query_params:
+        return request.query_params.get('force_refresh', '').lower() in ['true', '1', 'yes']
+    return False
+
+
+class AmigurumiProductListSerializer(serializers.ListSerializer):
+    """
+    List serializer that resolves images for the whole page in one batch
+
+    The list views render values() rows with serialize_product_rows instead;
+    AmigurumiProductSerializer(many=True) remains the reference output that
+    the tests hold serialize_product_rows to.
+    """
+
+    def to_representation(self, data):
+        """Prefetch images for every product before serializing the rows"""
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        products = list(iterable)
+
+        if not any(field in self.child.fields for field in IMAGE_FIELDS):
+            # No image field was requested, so nothing needs to be signed
+            return super().to_representation(products)
+
+        service = S3ImageService()
+        self.context['product_images'] = service.get_images_for_products(
+            [product.id for product in products],
+            force_refresh=_get_force_refresh(self.context)
+        )
+
+        return super().to_representation(products)
+
 
 class AmigurumiProductSerializer(serializers.ModelSerializer):
+    """
+    Product serializer with optional field selection.
+
+    ``?fields=id,name,primary_image`` limits the output to the listed fields
+    and ``?expand=images`` adds the full image list on top of that selection,
+    so card views can skip everything but the primary image.
+    """
     images = serializers.SerializerMethodField()
     primary_image = serializers.SerializerMethodField()
-    
+
     class Meta:
         model = AmigurumiProduct
-        fields = [
-            'id', 'name', 'description', 'price', 'category', 
-            'images', 'primary_image', 'is_featured', 'is_available', 
-            'created_at', 'updated_at'
-        ]
-    
+        fields = list(PRODUCT_FIELDS)
+        list_serializer_class = AmigurumiProductListSerializer
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        if _get_query_list(self.context, 'fields') is None:
+            return
+
+        allowed = set(_get_selected_fields(self.context))
+        for field_name in list(self.fields):
+            if field_name not in allowed:
+                self.fields.pop(field_name)
+
+    def _get_object_images(self, obj):
+        """
+        Resolve the images for a product once per request.
+
+        Both image fields read from the same entry, so each product costs a
+        single lookup even when force_refresh is set.
+        """
+        images_by_product = self.context.setdefault('product_images', {})
+        if obj.id not in images_by_product:
+            if _get_force_refresh(self.context):
+                images = obj.get_images(force_refresh=True)
+                # Keep the model's cached property in sync with the refresh
+                obj.__dict__['images'] = images
+            else:
+                images = obj.images
+            images_by_product[obj.id] = images
+        return images_by_product[obj.id]
+
     def get_images(self, obj):
         """Return all images for the product with presigned URLs"""
-        # Check if force_refresh parameter was passed in the request
-        request = self.context.get('request')
-        force_refresh = False
-        
-        if request and request.query_params:
-            force_refresh = request.query_params.get('force_refresh', '').lower() in ['true', '1', 'yes']
-        
-        return obj.get_images(force_refresh=force_refresh)
-    
+        return self._get_object_images(obj)
+
     def get_primary_image(self, obj):
         """Return the primary image for the product"""
-        # Check if force_refresh parameter was passed in the request
-        request = self.context.get('request')
-        force_refresh = False
-        
-        if request and request.query_params:
-            force_refresh = request.query_params.get('force_refresh', '').lower() in ['true', '1', 'yes']
-        
-        return obj.get_primary_image(force_refresh=force_refresh)
+        images = self._get_object_images(obj)
+        return images[0] if images else None
+
+
+def _format_decimal(value):
+    """Format a price the way DecimalField does; the database already applies decimal_places"""
+    return None if value is None else f'{value:f}'
+
+
+def _format_datetime(value, tz):
+    """Format a datetime the way DateTimeField does: in tz, ISO 8601, Z for UTC"""
+    if value is None:
+        return None
+    if tz is not None and value.tzinfo is not None:
+        value = value.astimezone(tz)
+    value = value.isoformat()
+    return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+
+def _get_value_formatters(tz) -> dict:
+    """Return the formatters for fields whose values() type differs from their JSON type"""
+    format_datetime = partial(_format_datetime, tz=tz)
+    return {
+        'price': _format_decimal,
+        'created_at': format_datetime,
+        'updated_at': format_datetime,
+    }
+
+
+def get_product_value_fields(context) -> List[str]:
+    """
+    Return the columns to fetch with ``values()`` for serialize_product_rows
+
+    Only the selected fields are read, plus ``id`` for the image lookup and
+    ``created_at`` for cursor pagination.
+    """
+    columns = [field_name for field_name in _get_selected_fields(context) if field_name not in IMAGE_FIELDS]
+    for field_name in ('id', 'created_at'):
+        if field_name not in columns:
+            columns.append(field_name)
+    return columns
+
+
+def requests_images(context) -> bool:
+    """Check whether the selected fields include an image field"""
+    return any(field_name in IMAGE_FIELDS for field_name in _get_selected_fields(context))
+
+
+def serialize_product_rows(rows: Iterable[dict], context,
+                           images_by_product: Optional[dict] = None) -> List[dict]:
+    """
+    Serialize ``values()`` rows into the same shape as AmigurumiProductSerializer
+
+    Read-only catalog pages skip model instances and per-field
+    ``to_representation`` calls: only the price and timestamps are formatted,
+    and images are resolved for the whole page in one batch.
+
+    Args:
+        rows: Rows of a ``values(*get_product_value_fields(context))`` queryset
+        context: Serializer context holding the request
+        images_by_product: Images already resolved for the rows, e.g. by
+            the async views; looked up here when None
+
+    Returns:
+        List of product dicts, ready to render
+    """
+    rows = list(rows)
+    fields = _get_selected_fields(context)
+
+    if images_by_product is None:
+        images_by_product = {}
+        if requests_images(context):
+            images_by_product = S3ImageService().get_images_for_products(
+                [row['id'] for row in rows],
+                force_refresh=_get_force_refresh(context)
+            )
+
+    # Resolving the current timezone is slow, so do it once per page
+    value_formatters = _get_value_formatters(timezone.get_current_timezone() if settings.USE_TZ else None)
+    formatters = [(field_name, value_formatters.get(field_name)) for field_name in fields]
+    products = []
+    for row in rows:
+        product = {}
+        for field_name, formatter in formatters:
+            if field_name == 'images':
+                product['images'] = images_by_product.get(row['id']) or []
+            elif field_name == 'primary_image':
+                images = images_by_product.get(row['id'])
+                product['primary_image'] = images[0] if images else None
+            elif formatter is not None:
+                product[field_name] = formatter(row[field_name])
+            else:
+                product[field_name] = row[field_name]
+        products.append(product)
+    return products
+
+
+class ProductSearchParamsSerializer(serializers.Serializer):
+    """Validate the query parameters of the product search endpoint"""
+    q = serializers.CharField(required=False, allow_blank=True, max_length=200, default='')
+    category = serializers.CharField(required=False)
+    min_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+    max_price = serializers.DecimalField(required=False, max_digits=10, decimal_places=2, min_value=0)
+
+    def validate_category(self, value):
+        """Accept category codes in any case, like the category endpoint"""
+        value = value.upper()
+        if value not in dict(AmigurumiProduct.CATEGORY_CHOICES):
+            raise serializers.ValidationError(f'"{value}" is not a valid category.')
+        return value
+
+    def validate(self, attrs):
+        if attrs.get('min_price') is not None and attrs.get('max_price') is not None \
+                and attrs['min_price'] > attrs['max_price']:
+            raise serializers.ValidationError({'max_price': 'Must not be lower than min_price.'})
+        return attrs
@@ -1,14 +1,596 @@
+import asyncio
 import boto3
+from boto3.s3.transfer import TransferConfig
 import logging
+import threading
+from botocore.config import Config
 from django.conf import settings
 from django.core.cache import cache
-from datetime import datetime, timedelta
-from typing import List, Optional
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections, transaction
+from django.db.models import Max
+from PIL import Image, ImageOps
+from collections import Counter, OrderedDict, defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
 from botocore.exceptions import ClientError, NoCredentialsError
+import base64
+import hashlib
+import math
+import hmac
+from io import BytesIO
+import mimetypes
 import os
+import time
+from urllib.parse import quote, urlsplit
+from .models import ProductImage
 
 logger = logging.getLogger(__name__)
 
+# Cache key namespace for product image entries:
+#     products:images:v<IMAGE_CACHE_KEY_VERSION>:<product_id>
+# Django prepends CACHE_KEY_PREFIX and CACHE_VERSION to every key. Bump
+# IMAGE_CACHE_KEY_VERSION whenever the layout of a cached entry changes so
+# workers running old and new code never read each other's entries.
+IMAGE_CACHE_KEY_VERSION = 5
+IMAGE_CACHE_KEY_PREFIX = f"products:images:v{IMAGE_CACHE_KEY_VERSION}"
+
+# Stamp bumped by any product or image change; rendered responses and
+# response validators are keyed on it.
+CATALOG_VERSION_KEY = "products:catalog:version"
+
+# Process-wide S3 client registry. boto3 low-level clients are thread-safe, so a
+# single client (and its HTTP connection pool) is shared by every
+# S3ImageService in the process. Entries are keyed by PID so that workers
+# forked after the first client was built (e.g. gunicorn --preload) create
+# their own client instead of reusing sockets inherited from the parent.
+_s3_clients = {}
+_s3_clients_lock = threading.Lock()
+
+
+def _build_s3_client_config() -> Config:
+    """Build the botocore client config from settings"""
+    return Config(
+        max_pool_connections=getattr(settings, 'S3_MAX_POOL_CONNECTIONS', 50),
+        tcp_keepalive=getattr(settings, 'S3_TCP_KEEPALIVE', True),
+        connect_timeout=getattr(settings, 'S3_CONNECT_TIMEOUT', 5),
+        read_timeout=getattr(settings, 'S3_READ_TIMEOUT', 30),
+        signature_version=getattr(settings, 'AWS_S3_SIGNATURE_VERSION', 's3v4'),
+        s3={'addressing_style': getattr(settings, 'AWS_S3_ADDRESSING_STYLE', 'auto')},
+        retries={
+            'max_attempts': getattr(settings, 'S3_MAX_RETRY_ATTEMPTS', 3),
+            'mode': getattr(settings, 'S3_RETRY_MODE', 'standard'),
+        },
+    )
+
+
+def _build_transfer_config() -> TransferConfig:
+    """Build the managed transfer config for uploads from settings"""
+    return TransferConfig(
+        multipart_threshold=getattr(settings, 'S3_UPLOAD_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+        multipart_chunksize=getattr(settings, 'S3_UPLOAD_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024),
+        max_concurrency=getattr(settings, 'S3_UPLOAD_MAX_CONCURRENCY', 4),
+    )
+
+
+def _create_s3_client():
+    """Create a new S3 client based on environment settings"""
+    config = _build_s3_client_config()
+    try:
+        if hasattr(settings, 'AWS_S3_ENDPOINT_URL') and settings.AWS_S3_ENDPOINT_URL:
+            # LocalStack or custom endpoint
+            return boto3.client(
+                's3',
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', 'test'),
+                aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', 'test'),
+                region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'),
+                use_ssl=getattr(settings, 'AWS_S3_USE_SSL', False),
+                verify=getattr(settings, 'AWS_S3_VERIFY', False),
+                config=config
+            )
+        else:
+            # AWS production environment
+            return boto3.client(
+                's3',
+                region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'),
+                config=config
+            )
+    except Exception as e:
+        logger.error(f"Failed to create S3 client: {e}")
+        raise
+
+
+def get_catalog_version() -> int:
+    """
+    Get the catalog version stamp
+
+    Returns:
+        time.time_ns() of the last product or image change, or 0 if nothing
+        changed since the cache was cleared
+    """
+    return cache.get(CATALOG_VERSION_KEY) or 0
+
+
+async def aget_catalog_version() -> int:
+    """Async variant of get_catalog_version"""
+    return await cache.aget(CATALOG_VERSION_KEY) or 0
+
+
+def bump_catalog_version() -> int:
+    """
+    Bump the catalog version, orphaning every cached catalog response
+
+    Returns:
+        The new version stamp
+    """
+    stamp = time.time_ns()
+    cache.set(CATALOG_VERSION_KEY, stamp, timeout=None)
+    return stamp
+
+
+def get_s3_client():
+    """
+    Get the shared S3 client for this process, creating it on first use
+
+    Returns:
+        A boto3 S3 client shared by all callers in the current process
+    """
+    pid = os.getpid()
+    client = _s3_clients.get(pid)
+    if client is not None:
+        return client
+
+    with _s3_clients_lock:
+        client = _s3_clients.get(pid)
+        if client is None:
+            # Drop clients inherited from a parent process before forking
+            _s3_clients.clear()
+            client = _create_s3_client()
+            _s3_clients[pid] = client
+            logger.debug(f"Created shared S3 client for process {pid}")
+        return client
+
+
+def reset_s3_client():
+    """Discard the shared S3 client so the next caller builds a new one"""
+    with _s3_clients_lock:
+        _s3_clients.clear()
+        _presigners.clear()
+
+
+@lru_cache(maxsize=16)
+def _get_signing_key(secret_key: str, datestamp: str, region: str, service: str) -> bytes:
+    """Derive the SigV4 signing key, cached per day/region/service"""
+    key = hmac.new(f"AWS4{secret_key}".encode('utf-8'), datestamp.encode('utf-8'), hashlib.sha256).digest()
+    for part in (region, service, 'aws4_request'):
+        key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+    return key
+
+
+class PresignedUrlSigner:
+    """
+    Generate SigV4 presigned GET URLs for a bucket without going through botocore.
+
+    botocore builds and signs a full request object for every
+    generate_presigned_url call. This signer reuses the URL layout of one
+    botocore-signed probe URL and only computes the query-string signature
+    per key, with the derived signing key cached per day. The resulting URLs
+    are byte-identical to boto3's for the same key, expiry and timestamp.
+    """
+
+    PROBE_KEY = 'presign-probe'
+    ALGORITHM = 'AWS4-HMAC-SHA256'
+
+    def __init__(self, s3_client, bucket_name: str):
+        self.region = s3_client.meta.region_name
+        # The client's own credential provider, so refreshable credentials
+        # are picked up exactly as botocore would
+        self._credentials = s3_client._request_signer._credentials
+
+        probe_url = s3_client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': bucket_name, 'Key': self.PROBE_KEY},
+            ExpiresIn=60
+        )
+        parts = urlsplit(probe_url)
+        self.host = parts.netloc
+        self._url_prefix = f"{parts.scheme}://{parts.netloc}"
+        self._path_prefix = parts.path[:-len(self.PROBE_KEY)]
+        # Every URL this signer builds starts with it
+        self.base_url = self._url_prefix + self._path_prefix
+
+    @classmethod
+    def is_supported(cls, s3_client) -> bool:
+        """Check if the client signs with SigV4 and has credentials"""
+        signature_version = s3_client.meta.config.signature_version
+        return (
+            signature_version in ('s3v4', 'v4')
+            and s3_client._request_signer._credentials is not None
+        )
+
+    def generate_presigned_urls(self, keys: List[str], expires_in: int, now: Optional[datetime] = None) -> List[str]:
+        """
+        Sign GET URLs for a list of keys
+
+        Args:
+            keys: S3 object keys in the bucket
+            expires_in: URL lifetime in seconds
+            now: Signing time (UTC), defaults to the current time
+
+        Returns:
+            List of presigned URLs in the same order as keys
+        """
+        if now is None:
+            now = datetime.now(timezone.utc)
+        credentials = self._credentials.get_frozen_credentials()
+        amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+        datestamp = amz_date[:8]
+        scope = f"{datestamp}/{self.region}/s3/aws4_request"
+        signing_key = _get_signing_key(credentials.secret_key, datestamp, self.region, 's3')
+
+        params = [
+            ('X-Amz-Algorithm', self.ALGORITHM),
+            ('X-Amz-Credential', f"{credentials.access_key}/{scope}"),
+            ('X-Amz-Date', amz_date),
+            ('X-Amz-Expires', str(expires_in)),
+            ('X-Amz-SignedHeaders', 'host'),
+        ]
+        if credentials.token:
+            params.append(('X-Amz-Security-Token', credentials.token))
+        encoded = [(name, quote(value, safe='-_.~')) for name, value in params]
+        # botocore keeps insertion order in the URL but signs sorted params
+        query = '&'.join(f"{name}={value}" for name, value in encoded)
+        canonical_query = '&'.join(f"{name}={value}" for name, value in sorted(encoded))
+        canonical_suffix = f"\n{canonical_query}\nhost:{self.host}\n\nhost\nUNSIGNED-PAYLOAD"
+        string_to_sign_prefix = f"{self.ALGORITHM}\n{amz_date}\n{scope}\n"
+
+        urls = []
+        for key in keys:
+            path = self._path_prefix + quote(key, safe='/~')
+            canonical_request = f"GET\n{path}{canonical_suffix}"
+            string_to_sign = string_to_sign_prefix + hashlib.sha256(canonical_request.encode('utf-8')).hexdigest()
+            signature = hmac.new(signing_key, string_to_sign.encode('utf-8'), hashlib.sha256).hexdigest()
+            urls.append(f"{self._url_prefix}{path}?{query}&X-Amz-Signature={signature}")
+        return urls
+
+
+_presigners = {}
+
+# SigV4 presigned URLs are valid for at most 7 days
+MAX_PRESIGNED_URL_EXPIRATION = 7 * 24 * 3600
+
+
+def get_presigned_url_signer(s3_client, bucket_name: str) -> Optional[PresignedUrlSigner]:
+    """
+    Get the offline signer for a client and bucket, creating it on first use
+
+    Returns:
+        The shared PresignedUrlSigner, or None if the client cannot be signed
+        for offline (e.g. SigV2 or anonymous access)
+    """
+    # Time-window signing needs to choose X-Amz-Date, which only this signer can do
+    if not getattr(settings, 'S3_FAST_PRESIGN', True) and not getattr(settings, 'S3_PRESIGN_TIME_WINDOW', 0):
+        return None
+
+    cache_key = (id(s3_client), bucket_name)
+    signer = _presigners.get(cache_key)
+    if signer is not None:
+        return signer
+
+    with _s3_clients_lock:
+        signer = _presigners.get(cache_key)
+        if signer is None:
+            if not PresignedUrlSigner.is_supported(s3_client):
+                return None
+            signer = PresignedUrlSigner(s3_client, bucket_name)
+            _presigners[cache_key] = signer
+        return signer
+
+
+# Shared-cache (L2) entries are plain tuples rather than the image dicts the
+# API returns, so they pickle small and their freshness can be read without
+# decoding anything:
+#     (IMAGE_CACHE_KEY_VERSION, version, min_expires_at, stored_until, path_prefix, query_prefix, images)
+# min_expires_at is the earliest URL expiry and stored_until the end of the
+# entry's own cache timeout, both as epoch ints (None if there is no limit). The URLs of an entry are built in one pass, so they all
+# start with the bucket (or CDN) URL and, when signed, end with the same query
+# string followed by a hex signature. Both prefixes are kept once per entry
+# and every URL is stored as its path and signature. One tuple per image:
+#     (key, is_default, width, height, size, placeholder, path, signature, variants, error)
+# with variants as (name, width, height, path, signature) tuples.
+
+# Length of the hex HMAC-SHA256 signature that ends SigV4 and signed CDN URLs
+URL_SIGNATURE_LENGTH = 64
+
+_get_image_fields = itemgetter('key', 'is_default', 'width', 'height', 'size', 'placeholder')
+
+
+def _get_min_expires_at(images: List[dict]) -> Optional[int]:
+    """Return the earliest URL expiry of a list of images as an epoch int"""
+    # Images signed together share one expiry object
+    expiries = {image_data.get('expires_at') for image_data in images}
+    expiries.discard(None)
+    if not expiries:
+        return None
+    return min(
+        int((datetime.fromisoformat(expires_at) if isinstance(expires_at, str) else expires_at).timestamp())
+        for expires_at in expiries
+    )
+
+
+def _encode_cache_entry(images: List[dict], version, path_prefix: str = '', signed: bool = False,
+                        timeout: Optional[int] = None) -> tuple:
+    """
+    Encode product images into the compact shared-cache layout
+
+    Args:
+        images: Image dictionaries as returned by the service
+        version: Version stamp the entry was built under
+        path_prefix: Bucket (or CDN) URL every image URL starts with
+        signed: Whether the URLs were signed together and end with
+            a URL_SIGNATURE_LENGTH hex signature
+        timeout: Seconds the entry is cached for, None for no limit
+
+    Returns:
+        Tuple in the layout described above
+    """
+    query_prefix = ''
+    path_end = None
+    signature_slice = slice(0, 0)
+    if signed:
+        url = next((image_data['url'] for image_data in images if image_data['url'] is not None), None)
+        if url is not None:
+            query_prefix = url[url.find('?'):-URL_SIGNATURE_LENGTH]
+            path_end = -len(query_prefix) - URL_SIGNATURE_LENGTH
+            signature_slice = slice(-URL_SIGNATURE_LENGTH, None)
+    path_slice = slice(len(path_prefix), path_end)
+
+    encoded_images = []
+    for image_data in images:
+        url = image_data['url']
+        encoded_images.append((
+            *_get_image_fields(image_data),
+            url and url[path_slice],
+            url and url[signature_slice],
+            tuple([
+                (name, variant['width'], variant['height'], variant_url[path_slice], variant_url[signature_slice])
+                for name, variant in image_data['variants'].items()
+                for variant_url in (variant['url'],)
+            ]),
+            image_data.get('error'),
+        ))
+
+    return (
+        IMAGE_CACHE_KEY_VERSION,
+        version,
+        _get_min_expires_at(images),
+        int(time.time() + timeout) if timeout is not None else None,
+        path_prefix,
+        query_prefix,
+        tuple(encoded_images),
+    )
+
+
+def _read_cache_entry_header(entry) -> Optional[Tuple[object, Optional[int], Optional[int]]]:
+    """
+    Read the version stamp, min_expires_at and stored_until of an encoded entry
+
+    Returns:
+        Tuple of (version, min_expires_at, stored_until), or None if entry is
+        missing or was written in another layout
+    """
+    if not isinstance(entry, tuple) or not entry or entry[0] != IMAGE_CACHE_KEY_VERSION:
+        return None
+    return entry[1], entry[2], entry[3]
+
+
+def _decode_cache_entry(entry: tuple) -> List[dict]:
+    """Rebuild the image dictionaries of an encoded shared-cache entry"""
+    _, _, min_expires_at, _, path_prefix, query_prefix, encoded_images = entry
+    expires_at = datetime.fromtimestamp(min_expires_at) if min_expires_at is not None else None
+
+    images = []
+    for (key, is_default, width, height, size, placeholder,
+         path, signature, variants, error) in encoded_images:
+        image_data = {
+            'url': None if path is None else f"{path_prefix}{path}{query_prefix}{signature}",
+            'filename': key.rpartition('/')[2],
+            'key': key,
+            'expires_at': expires_at,
+            'is_default': is_default,
+            'width': width,
+            'height': height,
+            'size': size,
+            'placeholder': placeholder,
+            'variants': {
+                name: {
+                    'url': f"{path_prefix}{variant_path}{query_prefix}{variant_signature}",
+                    'width': variant_width,
+                    'height': variant_height,
+                }
+                for name, variant_width, variant_height, variant_path, variant_signature in variants
+            },
+        }
+        if error is not None:
+            image_data['error'] = error
+        images.append(image_data)
+    return images
+
+
+class _L1Entry:
+    """Product images held in the in-process cache"""
+
+    __slots__ = ('images', 'version', 'expires_at', 'checked_at')
+
+    def __init__(self, images: List[dict], version, expires_at: float, checked_at: float):
+        self.images = images
+        self.version = version
+        self.expires_at = expires_at
+        self.checked_at = checked_at
+
+
+class ImageMetadataL1Cache:
+    """
+    Bounded, thread-safe LRU cache for product images kept in process memory.
+
+    Sits in front of Django's cache (L2). Each entry remembers the version
+    stamp it was built under and expires before the earliest presigned URL it
+    holds, so it never serves an entry that L2 would reject.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, product_id: int) -> Optional[_L1Entry]:
+        """Return the live entry for a product, or None"""
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                del self._entries[product_id]
+                return None
+            self._entries.move_to_end(product_id)
+            return entry
+
+    def set(self, product_id: int, images: List[dict], version, expires_at: float):
+        """Store images for a product, evicting the least recently used entry"""
+        if self.max_entries <= 0 or expires_at <= time.time():
+            return
+        with self._lock:
+            self._entries[product_id] = _L1Entry(images, version, expires_at, time.time())
+            self._entries.move_to_end(product_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, product_id: int):
+        """Drop the entry for a product"""
+        with self._lock:
+            self._entries.pop(product_id, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+
+_l1_cache = ImageMetadataL1Cache(getattr(settings, 'S3_IMAGE_L1_MAX_ENTRIES', 1024))
+
+# Hit/miss counters for both cache tiers, per process
+_cache_stats = Counter()
+_cache_stats_lock = threading.Lock()
+
+
+def _record_cache_stats(**counts):
+    with _cache_stats_lock:
+        _cache_stats.update(counts)
+
+
+def get_image_cache_stats() -> Dict[str, int]:
+    """Return hit/miss counters for the L1 and L2 image caches in this process"""
+    with _cache_stats_lock:
+        return {
+            'l1_hits': _cache_stats['l1_hits'],
+            'l1_misses': _cache_stats['l1_misses'],
+            'l2_hits': _cache_stats['l2_hits'],
+            'l2_misses': _cache_stats['l2_misses'],
+        }
+
+
+def reset_image_cache_stats():
+    """Reset the hit/miss counters"""
+    with _cache_stats_lock:
+        _cache_stats.clear()
+
+
+# Background refreshes for stale-while-revalidate. Like the S3 client, the
+# executor is rebuilt in forked children because threads do not survive fork.
+_refresh_executors = {}
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+# Per-product locks so only one thread per process rebuilds an entry. Locks
+# are reference counted and dropped once no thread holds or waits for them.
+_rebuild_locks = {}
+_rebuild_locks_guard = threading.Lock()
+
+
+@contextmanager
+def _product_rebuild_lock(product_id: int, timeout: float):
+    """
+    Try to hold the in-process rebuild lock for a product
+
+    Args:
+        product_id: The ID of the product
+        timeout: Seconds to wait for another thread's rebuild, 0 to not wait
+
+    Yields:
+        True if the lock is held, False if the wait timed out
+    """
+    with _rebuild_locks_guard:
+        lock_entry = _rebuild_locks.get(product_id)
+        if lock_entry is None:
+            lock_entry = _rebuild_locks[product_id] = [threading.Lock(), 0]
+        lock_entry[1] += 1
+    acquired = False
+    try:
+        acquired = lock_entry[0].acquire(timeout=timeout)
+        yield acquired
+    finally:
+        if acquired:
+            lock_entry[0].release()
+        with _rebuild_locks_guard:
+            lock_entry[1] -= 1
+            if lock_entry[1] == 0:
+                del _rebuild_locks[product_id]
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    """Get the background refresh thread pool for this process"""
+    pid = os.getpid()
+    with _refreshing_lock:
+        executor = _refresh_executors.get(pid)
+        if executor is None:
+            _refresh_executors.clear()
+            _refreshing.clear()
+            executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'S3_IMAGE_REFRESH_WORKERS', 2),
+                thread_name_prefix='image-cache-refresh'
+            )
+            _refresh_executors[pid] = executor
+        return executor
+
+
+# Threads the async lookups rebuild cache misses on, shared by every request in
+# the process so concurrent pages don't each start their own pool. Rebuilt in
+# forked children like the refresh executor.
+_async_fetch_executors = {}
+_async_fetch_executors_lock = threading.Lock()
+
+
+def _get_async_fetch_executor() -> ThreadPoolExecutor:
+    """Get the thread pool async image lookups rebuild misses on"""
+    pid = os.getpid()
+    with _async_fetch_executors_lock:
+        executor = _async_fetch_executors.get(pid)
+        if executor is None:
+            _async_fetch_executors.clear()
+            executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'S3_IMAGE_ASYNC_FETCH_THREADS', 32),
+                thread_name_prefix='image-async-fetch'
+            )
+            _async_fetch_executors[pid] = executor
+        return executor
+
+
 class S3ImageService:
     """Service for handling S3 image operations with caching"""
     
@@ -16,67 +598,219 @@ class S3ImageService:
         self.bucket_name = getattr(settings, 'AWS_S3_BUCKET_NAME', 'product-image-collection')
         self.cache_timeout = getattr(settings, 'S3_PRESIGNED_URL_CACHE_TIMEOUT', 3600)  # 1 hour
         self.presigned_url_expiration = getattr(settings, 'S3_PRESIGNED_URL_EXPIRATION', 3600)  # 1 hour
+        self.presign_time_window = getattr(settings, 'S3_PRESIGN_TIME_WINDOW', 0)
+        if self.presigned_url_expiration + self.presign_time_window > MAX_PRESIGNED_URL_EXPIRATION:
+            # URLs signed late in a window would not get their full lifetime
+            raise ImproperlyConfigured(
+                "S3_PRESIGNED_URL_EXPIRATION plus S3_PRESIGN_TIME_WINDOW exceeds SigV4's 7 day limit"
+            )
+        self.url_mode = getattr(settings, 'S3_IMAGE_URL_MODE', 'presigned')
+        if self.url_mode not in ('presigned', 'public', 'cdn'):
+            raise ImproperlyConfigured(
+                f"Unknown S3_IMAGE_URL_MODE '{self.url_mode}', expected 'presigned', 'public' or 'cdn'"
+            )
+        self.cdn_base_url = getattr(settings, 'S3_IMAGE_CDN_BASE_URL', '')
+        self.cdn_signing_key = getattr(settings, 'S3_IMAGE_CDN_SIGNING_KEY', '')
+        self.public_base_url = self._get_public_base_url() if self.url_mode != 'presigned' else None
+        if self.url_mode != 'presigned':
+            # Public URLs never expire, so entries live until invalidated
+            self.cache_timeout = None
         self.default_image_key = getattr(settings, 'S3_DEFAULT_IMAGE_KEY', 'image_not_found.png')
-        self.s3_client = self._get_s3_client()
-    
-    def _get_s3_client(self):
-        """Get S3 client based on environment settings"""
-        try:
-            if hasattr(settings, 'AWS_S3_ENDPOINT_URL') and settings.AWS_S3_ENDPOINT_URL:
-                # LocalStack or custom endpoint
-                return boto3.client(
-                    's3',
-                    endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-                    aws_access_key_id=getattr(settings, 'AWS_ACCESS_KEY_ID', 'test'),
-                    aws_secret_access_key=getattr(settings, 'AWS_SECRET_ACCESS_KEY', 'test'),
-                    region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'),
-                    use_ssl=getattr(settings, 'AWS_S3_USE_SSL', False),
-                    verify=getattr(settings, 'AWS_S3_VERIFY', False)
-                )
-            else:
-                # AWS production environment
-                return boto3.client(
-                    's3',
-                    region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
-                )
-        except Exception as e:
-            logger.error(f"Failed to create S3 client: {e}")
-            raise
+        self.fetch_workers = getattr(settings, 'S3_IMAGE_FETCH_WORKERS', 8)
+        self.async_fetch_concurrency = getattr(settings, 'S3_IMAGE_ASYNC_FETCH_CONCURRENCY', self.fetch_workers)
+        self.list_page_size = getattr(settings, 'S3_LIST_PAGE_SIZE', 1000)
+        self.image_source = getattr(settings, 'S3_IMAGE_SOURCE', 'manifest')
+        self.manifest_list_fallback = getattr(settings, 'S3_IMAGE_MANIFEST_LIST_FALLBACK', True)
+        self.transfer_config = _build_transfer_config()
+        self.l1_version_check_interval = getattr(settings, 'S3_IMAGE_L1_VERSION_CHECK_INTERVAL', 5)
+        self.refresh_buffer = getattr(settings, 'S3_IMAGE_CACHE_REFRESH_BUFFER', 300)  # 5 minutes
+        self.stale_buffer = getattr(settings, 'S3_IMAGE_CACHE_STALE_BUFFER', 60)
+        self.stale_while_revalidate = getattr(settings, 'S3_IMAGE_CACHE_STALE_WHILE_REVALIDATE', False)
+        self.refresh_lock_timeout = getattr(settings, 'S3_IMAGE_REFRESH_LOCK_TIMEOUT', 10)
+        self.rebuild_wait = getattr(settings, 'S3_IMAGE_REBUILD_WAIT', 2.0)
+        self.rebuild_poll_interval = getattr(settings, 'S3_IMAGE_REBUILD_POLL_INTERVAL', 0.05)
+        self.variants = getattr(settings, 'S3_IMAGE_VARIANTS', {})
+        self.variant_prefix = getattr(settings, 'S3_IMAGE_VARIANT_PREFIX', 'variants')
+        self.variant_format = getattr(settings, 'S3_IMAGE_VARIANT_FORMAT', 'webp')
+        self.variant_quality = getattr(settings, 'S3_IMAGE_VARIANT_QUALITY', 80)
+        self.placeholder_width = getattr(settings, 'S3_IMAGE_PLACEHOLDER_WIDTH', 16)
+        self.response_max_age = getattr(settings, 'CATALOG_CACHE_MAX_AGE', 60)
+        self.s3_client = get_s3_client()
     
     def _get_cache_key(self, product_id: int) -> str:
         """Generate cache key for product images"""
-        return f"product_images_{product_id}"
+        return f"{IMAGE_CACHE_KEY_PREFIX}:{product_id}"
+
+    def _get_version_key(self, product_id: int) -> str:
+        """Generate cache key for the version stamp of a product's images"""
+        return f"{IMAGE_CACHE_KEY_PREFIX}:version:{product_id}"
+
+    def get_images_version(self, product_id: int) -> int:
+        """
+        Get the version stamp of a product's images
+
+        Returns:
+            The stamp (time.time_ns() of the last invalidation), or 0 if the
+            images were never invalidated
+        """
+        return cache.get(self._get_version_key(product_id)) or 0
+
+    async def aget_images_version(self, product_id: int) -> int:
+        """Async variant of get_images_version"""
+        return await cache.aget(self._get_version_key(product_id)) or 0
+
+    def get_response_max_age(self) -> int:
+        """
+        Get how long a response embedding image URLs may be reused by clients
+
+        Public and CDN URLs never expire, so CATALOG_CACHE_MAX_AGE is used
+        as is. Presigned URLs in a served response are only guaranteed to
+        outlive the refresh buffer (the stale buffer when serving stale
+        entries), and a client may reuse a response for one URL epoch plus
+        max-age, so each gets at most half of that.
+
+        Returns:
+            max-age in seconds; 0 means responses must not be reused
+        """
+        max_age = self.response_max_age
+        if self.url_mode == 'presigned':
+            remaining = self.stale_buffer if self.stale_while_revalidate else self.refresh_buffer
+            max_age = min(max_age, remaining // 2)
+        return max(max_age, 0)
+
+    def get_url_epoch(self, max_age: int) -> int:
+        """
+        Get the start of the current URL epoch, as a unix timestamp
+
+        Response validators include the epoch so that a client cannot keep
+        revalidating a response whose presigned URLs are about to expire.
+        URLs that never expire share a single epoch.
+
+        Args:
+            max_age: Value returned by get_response_max_age()
+        """
+        if self.url_mode != 'presigned' or max_age <= 0:
+            return 0
+        now = int(time.time())
+        return now - now % max_age
     
+    def _iter_objects(self, prefix: str = ''):
+        """
+        Yield every object under a prefix, following continuation tokens
+
+        Args:
+            prefix: Key prefix to list, or '' for the whole bucket
+
+        Yields:
+            Object dictionaries as returned by list_objects_v2 ('Key', 'Size', 'ETag', ...)
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(
+            Bucket=self.bucket_name,
+            Prefix=prefix,
+            PaginationConfig={'PageSize': self.list_page_size}
+        ):
+            for obj in page.get('Contents', []):
+                # Skip if it's just the directory (ends with /)
+                if not obj['Key'].endswith('/'):
+                    yield obj
+
     def _list_product_images(self, product_id: int) -> List[str]:
         """List all images for a product from S3"""
         try:
-            prefix = f"{product_id}/"
-            response = self.s3_client.list_objects_v2(
-                Bucket=self.bucket_name,
-                Prefix=prefix
-            )
-            
-            if 'Contents' not in response:
-                return []
-            
-            # Extract the image keys and filter out directories
-            image_keys = []
-            for obj in response['Contents']:
-                key = obj['Key']
-                # Skip if it's just the directory (ends with /)
-                if not key.endswith('/'):
-                    image_keys.append(key)
-            
-            return image_keys
+            return [obj['Key'] for obj in self._iter_objects(f"{product_id}/")]
         except ClientError as e:
             logger.error(f"Error listing images for product {product_id}: {e}")
             return []
         except Exception as e:
             logger.error(f"Unexpected error listing images for product {product_id}: {e}")
             return []
-    
-    def _generate_presigned_urls(self, image_keys: List[str]) -> List[dict]:
-        """Generate presigned URLs for a list of image keys"""
+
+    def list_images_for_products(self, product_ids: Iterable[int]) -> Dict[int, List[str]]:
+        """
+        List the image keys of several products concurrently
+
+        Each product prefix is listed (with pagination) on a thread pool
+        bounded by S3_IMAGE_FETCH_WORKERS.
+
+        Args:
+            product_ids: IDs of the products to list
+
+        Returns:
+            Dictionary mapping each product ID to its image keys
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        if len(product_ids) <= 1:
+            return {product_id: self._list_product_images(product_id) for product_id in product_ids}
+
+        with ThreadPoolExecutor(max_workers=min(self.fetch_workers, len(product_ids))) as executor:
+            return dict(zip(product_ids, executor.map(self._list_product_images, product_ids)))
+
+    def list_all_product_images(self) -> Dict[int, List[str]]:
+        """
+        List the whole bucket once and group image keys by product
+
+        Cheaper than one listing per product when warming up most of the
+        catalog: each list_objects_v2 page returns up to 1000 keys across
+        many products. Keys outside a numeric "<product_id>/" prefix (such as
+        the default image) are ignored.
+
+        Returns:
+            Dictionary mapping product IDs to their image keys
+        """
+        images_by_product = defaultdict(list)
+        for obj in self._iter_objects():
+            product_prefix, separator, _ = obj['Key'].partition('/')
+            if separator and product_prefix.isdigit():
+                images_by_product[int(product_prefix)].append(obj['Key'])
+        return dict(images_by_product)
+
+    def _generate_presigned_urls(self, image_keys: List[str],
+                                 metadata_by_key: Optional[Dict[str, dict]] = None) -> List[dict]:
+        """
+        Generate presigned URLs for a list of image keys
+
+        Args:
+            image_keys: S3 keys of the original images
+            metadata_by_key: Manifest metadata of each original, if known
+
+        Returns:
+            Image dictionaries with dimensions, size and placeholder when known,
+            and a signed URL per variant under 'variants'
+        """
+        metadata_by_key = metadata_by_key or {}
+        variant_keys = [
+            variant['key']
+            for key in image_keys
+            for variant in metadata_by_key.get(key, {}).get('variants', {}).values()
+        ]
+        urls_by_key = None
+
+        if self.url_mode != 'presigned':
+            # Public objects: plain string formatting, nothing expires
+            urls_by_key = {key: self._build_public_url(key) for key in image_keys + variant_keys}
+            expires_at = None
+        else:
+            signer = get_presigned_url_signer(self.s3_client, self.bucket_name)
+            if signer is not None:
+                # Sign every key and variant offline with one timestamp and signing key
+                signed_at, expires_in, expires_at = self._get_signing_time()
+                urls = signer.generate_presigned_urls(image_keys + variant_keys, expires_in, now=signed_at)
+                urls_by_key = dict(zip(image_keys + variant_keys, urls))
+
+        if urls_by_key is not None:
+            return [
+                {
+                    'url': urls_by_key[key],
+                    'filename': key.split('/')[-1],
+                    'key': key,
+                    'expires_at': expires_at,
+                    'is_default': False,
+                    **self._build_image_metadata(metadata_by_key.get(key, {}), urls_by_key.get)
+                }
+                for key in image_keys
+            ]
+
         presigned_urls = []
         
         for key in image_keys:
@@ -95,34 +829,252 @@ class S3ImageService:
                     'filename': filename,
                     'key': key,
                     'expires_at': datetime.now() + timedelta(seconds=self.presigned_url_expiration),
-                    'is_default': False
+                    'is_default': False,
+                    **self._build_image_metadata(
+                        metadata_by_key.get(key, {}),
+                        lambda variant_key: self.s3_client.generate_presigned_url(
+                            'get_object',
+                            Params={'Bucket': self.bucket_name, 'Key': variant_key},
+                            ExpiresIn=self.presigned_url_expiration
+                        )
+                    )
                 })
             except ClientError as e:
                 logger.error(f"Error generating presigned URL for {key}: {e}")
                 continue
         
         return presigned_urls
+
+    def _get_public_base_url(self) -> str:
+        """Base URL that public and CDN image URLs are built on"""
+        if self.url_mode == 'cdn':
+            if not self.cdn_base_url:
+                raise ImproperlyConfigured("S3_IMAGE_URL_MODE is 'cdn' but S3_IMAGE_CDN_BASE_URL is not set")
+            return self.cdn_base_url.rstrip('/')
+
+        public_base_url = getattr(settings, 'S3_IMAGE_PUBLIC_BASE_URL', '')
+        if public_base_url:
+            return public_base_url.rstrip('/')
+        endpoint_url = getattr(settings, 'AWS_S3_ENDPOINT_URL', None)
+        if endpoint_url:
+            # LocalStack or custom endpoint, path-style
+            return f"{endpoint_url.rstrip('/')}/{self.bucket_name}"
+        region = getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
+        return f"https://{self.bucket_name}.s3.{region}.amazonaws.com"
+
+    def _get_url_layout(self) -> Tuple[str, bool]:
+        """
+        Describe the URLs built for the shared-cache encoding
+
+        Returns:
+            Tuple of the bucket (or CDN) URL every image URL starts with ('' if
+            unknown) and whether the URLs of one build end with the same query
+            and a hex signature
+        """
+        if self.url_mode != 'presigned':
+            return f"{self.public_base_url}/", self.url_mode == 'cdn' and bool(self.cdn_signing_key)
+        signer = get_presigned_url_signer(self.s3_client, self.bucket_name)
+        # botocore signs URLs one by one, possibly across a second boundary
+        return (signer.base_url, True) if signer is not None else ('', False)
+
+    def _build_public_url(self, key: str) -> str:
+        """
+        Build the unsigned URL of a public object
+
+        In 'cdn' mode with S3_IMAGE_CDN_SIGNING_KEY set, a 'sig' parameter
+        holding the HMAC-SHA256 of the URL path is appended so the CDN edge
+        can reject URLs that were not issued by the backend. It does not
+        expire, so URLs stay cacheable until the image is invalidated.
+        """
+        path = f"/{quote(key, safe='/~')}"
+        url = f"{self.public_base_url}{path}"
+        if self.url_mode == 'cdn' and self.cdn_signing_key:
+            signature = hmac.new(self.cdn_signing_key.encode('utf-8'), path.encode('utf-8'), hashlib.sha256).hexdigest()
+            url = f"{url}?sig={signature}"
+        return url
+
+    def _get_signing_time(self) -> Tuple[Optional[datetime], int, datetime]:
+        """
+        Choose the signing time and lifetime for offline-signed URLs
+
+        With S3_PRESIGN_TIME_WINDOW set, URLs are signed at the start of the
+        current window and live for S3_PRESIGNED_URL_EXPIRATION plus one window.
+        Every worker and refresh within a window then produces byte-identical
+        URLs, so browsers and CDNs can reuse cached downloads, and each URL is
+        still valid for at least S3_PRESIGNED_URL_EXPIRATION seconds.
+
+        Returns:
+            Tuple of (signing time or None for now, ExpiresIn seconds, expires_at)
+        """
+        if not self.presign_time_window:
+            return None, self.presigned_url_expiration, datetime.now() + timedelta(seconds=self.presigned_url_expiration)
+
+        window_start = int(time.time()) // self.presign_time_window * self.presign_time_window
+        expires_in = self.presigned_url_expiration + self.presign_time_window
+        return (
+            datetime.fromtimestamp(window_start, timezone.utc),
+            expires_in,
+            datetime.fromtimestamp(window_start + expires_in)
+        )
+
+    def _build_image_metadata(self, metadata: dict, sign) -> dict:
+        """
+        Build the layout fields of an image record from its manifest metadata
+
+        Args:
+            metadata: Manifest metadata of one image (empty when unknown)
+            sign: Callable returning the URL for a variant key
+
+        Returns:
+            Dictionary with width, height, size, placeholder and variants,
+            each variant holding its url, width and height
+        """
+        return {
+            'width': metadata.get('width'),
+            'height': metadata.get('height'),
+            'size': metadata.get('size'),
+            'placeholder': metadata.get('placeholder') or None,
+            'variants': {
+                name: {
+                    'url': sign(variant['key']),
+                    'width': variant.get('width'),
+                    'height': variant.get('height'),
+                }
+                for name, variant in metadata.get('variants', {}).items()
+            },
+        }
     
-    def _is_cache_valid(self, cached_data: dict) -> bool:
-        """Check if cached presigned URLs are still valid"""
-        if not cached_data or 'images' not in cached_data:
-            return False
-        
-        # Check if any URL has expired (with 5 minute buffer)
-        buffer_time = timedelta(minutes=5)
-        current_time = datetime.now()
-        
-        for image_data in cached_data['images']:
-            if 'expires_at' in image_data:
-                expires_at = image_data['expires_at']
-                if isinstance(expires_at, str):
-                    expires_at = datetime.fromisoformat(expires_at)
-                
-                if current_time + buffer_time >= expires_at:
-                    return False
-        
-        return True
+    def _get_cache_state(self, min_expires_at: Optional[int]) -> str:
+        """
+        Classify a cache entry by how close its URLs are to expiring
+
+        Args:
+            min_expires_at: Earliest URL expiry of the entry (epoch), None if
+                its URLs never expire
+
+        Returns:
+            'fresh' while every URL has more than S3_IMAGE_CACHE_REFRESH_BUFFER
+            seconds left, 'stale' while they still have more than
+            S3_IMAGE_CACHE_STALE_BUFFER seconds left, otherwise 'expired'
+        """
+        if min_expires_at is None:
+            return 'fresh'
+
+        remaining = min_expires_at - time.time()
+        if remaining > self.refresh_buffer:
+            return 'fresh'
+        if remaining > self.stale_buffer:
+            return 'stale'
+        return 'expired'
+
+    def _is_cache_valid(self, entry) -> bool:
+        """Check if an encoded cache entry holds presigned URLs that are still valid"""
+        header = _read_cache_entry_header(entry)
+        return header is not None and self._get_cache_state(header[1]) == 'fresh'
     
+    def _get_manifest_keys(self, product_ids: List[int],
+                           metadata_by_key: Optional[Dict[str, dict]] = None) -> Dict[int, List[str]]:
+        """
+        Read image keys for several products from the ProductImage manifest
+
+        Args:
+            product_ids: IDs of the products to look up
+            metadata_by_key: If given, filled with the dimensions, size,
+                placeholder and variants of every key found
+
+        Returns:
+            Dictionary mapping every product ID to its keys in display order
+        """
+        rows = self._get_manifest_rows(product_ids, metadata_by_key)
+        return self._group_manifest_rows(product_ids, rows, metadata_by_key)
+
+    async def _aget_manifest_keys(self, product_ids: List[int],
+                                  metadata_by_key: Optional[Dict[str, dict]] = None) -> Dict[int, List[str]]:
+        """Async variant of _get_manifest_keys"""
+        rows = self._get_manifest_rows(product_ids, metadata_by_key)
+        return self._group_manifest_rows(product_ids, [row async for row in rows], metadata_by_key)
+
+    def _get_manifest_rows(self, product_ids: List[int], metadata_by_key: Optional[Dict[str, dict]]):
+        """Query the manifest rows of several products, in display order"""
+        rows = ProductImage.objects.filter(product_id__in=product_ids).order_by('product_id', 'position', 'key')
+        if metadata_by_key is None:
+            return rows.values_list('product_id', 'key')
+        return rows.values('product_id', 'key', 'width', 'height', 'size', 'placeholder', 'variants')
+
+    def _group_manifest_rows(self, product_ids: List[int], rows,
+                             metadata_by_key: Optional[Dict[str, dict]]) -> Dict[int, List[str]]:
+        """Group the rows of _get_manifest_rows into keys by product, filling metadata_by_key"""
+        keys_by_product = {product_id: [] for product_id in product_ids}
+        if metadata_by_key is None:
+            for product_id, key in rows:
+                keys_by_product[product_id].append(key)
+            return keys_by_product
+
+        for row in rows:
+            keys_by_product[row.pop('product_id')].append(row['key'])
+            metadata_by_key[row.pop('key')] = row
+        return keys_by_product
+
+    def _fetch_product_images(self, product_id: int, image_keys: Optional[List[str]] = None,
+                              metadata_by_key: Optional[Dict[str, dict]] = None,
+                              list_if_missing: bool = False) -> Tuple[dict, Optional[int]]:
+        """
+        Find and sign the images for a product, bypassing the cache
+
+        Image keys come from the ProductImage manifest, or from an S3 listing
+        when S3_IMAGE_SOURCE is 's3'. Products without manifest rows are
+        listed too unless S3_IMAGE_MANIFEST_LIST_FALLBACK is off, so images
+        uploaded outside Django show up before the manifest is reconciled.
+
+        Args:
+            product_id: The ID of the product
+            image_keys: Keys already read from the manifest, if any
+            metadata_by_key: Manifest metadata read along with image_keys, by key
+            list_if_missing: If True, list S3 when image_keys is empty
+
+        Returns:
+            Tuple of (cache_data, cache timeout in seconds or None for no expiry)
+        """
+        if image_keys is None and self.image_source == 'manifest':
+            metadata_by_key = {}
+            image_keys = self._get_manifest_keys([product_id], metadata_by_key)[product_id]
+            list_if_missing = self.manifest_list_fallback
+        elif image_keys is None:
+            # List all images for this product
+            logger.debug(f"Fetching images from S3 for product {product_id}")
+            image_keys = self._list_product_images(product_id)
+
+        if not image_keys and list_if_missing:
+            logger.debug(f"No manifest rows for product {product_id}, listing S3")
+            image_keys = self._list_product_images(product_id)
+
+        if not image_keys:
+            # No images found for this product - use default image
+            logger.debug(f"No images found for product {product_id}, using default image")
+            cache_data = {
+                'images': [self._get_default_image()],
+                'cached_at': datetime.now(),
+                'is_default': True
+            }
+            # Cache the default image result for shorter time
+            return cache_data, 300  # 5 minutes for default image
+
+        # Generate presigned URLs for actual product images
+        cache_data = {
+            'images': self._generate_presigned_urls(image_keys, metadata_by_key),
+            'cached_at': datetime.now(),
+            'is_default': False
+        }
+        return cache_data, self.cache_timeout
+
+    def _get_fallback_images(self) -> List[dict]:
+        """Return the default image as fallback when fetching images fails"""
+        try:
+            return [self._get_default_image()]
+        except Exception as fallback_error:
+            logger.error(f"Error getting default image as fallback: {fallback_error}")
+            return []
+
     def get_product_images(self, product_id: int, force_refresh: bool = False) -> List[dict]:
         """
         Get product images with caching. If no images exist, return default image.
@@ -134,73 +1086,578 @@ class S3ImageService:
         Returns:
             List of dictionaries containing image data with presigned URLs
         """
+        return self.get_images_for_products([product_id], force_refresh=force_refresh)[product_id]
+
+    def _get_l1_expiry(self, min_expires_at: Optional[int], stored_until: Optional[int]) -> float:
+        """
+        Compute when an entry must leave the in-process cache.
+
+        That is the earlier of the end of its L2 timeout and the point where
+        the first presigned URL enters the refresh buffer.
+        """
+        expires_at = stored_until if stored_until is not None else math.inf
+        if min_expires_at is not None:
+            expires_at = min(expires_at, min_expires_at - self.refresh_buffer)
+        return expires_at
+
+    def _get_lock_key(self, product_id: int) -> str:
+        """Generate cache key for the rebuild lock of a product's images"""
+        return f"{IMAGE_CACHE_KEY_PREFIX}:lock:{product_id}"
+
+    def _store_cache_entry(self, product_id: int, cache_data: dict, timeout: Optional[int], version):
+        """Write a freshly built entry to both cache tiers"""
+        entry = _encode_cache_entry(cache_data['images'], version, *self._get_url_layout(), timeout=timeout)
+        cache.set(self._get_cache_key(product_id), entry, timeout=timeout)
+        _l1_cache.set(product_id, cache_data['images'], version, self._get_l1_expiry(entry[2], entry[3]))
+
+    def _schedule_refresh(self, product_id: int):
+        """
+        Refresh a stale entry in the background.
+
+        At most one refresh per product runs at a time: an in-process set
+        dedupes threads and a lock in the shared cache dedupes workers.
+        """
+        executor = _get_refresh_executor()
+        with _refreshing_lock:
+            if product_id in _refreshing:
+                return
+            _refreshing.add(product_id)
+
+        if not cache.add(self._get_lock_key(product_id), 1, timeout=self.refresh_lock_timeout):
+            # Another worker is already refreshing this product
+            with _refreshing_lock:
+                _refreshing.discard(product_id)
+            return
+
+        logger.debug(f"Scheduling background refresh for product {product_id}")
+        executor.submit(self._refresh_product_images, product_id)
+
+    def _refresh_product_images(self, product_id: int):
+        """Rebuild a product's cache entry and release its refresh lock"""
+        # Runs outside the request cycle, so manage the thread's DB connection
+        close_old_connections()
+        try:
+            version = cache.get(self._get_version_key(product_id))
+            cache_data, timeout = self._fetch_product_images(product_id)
+            self._store_cache_entry(product_id, cache_data, timeout, version)
+        except Exception as e:
+            logger.error(f"Error refreshing images for product {product_id}: {e}")
+        finally:
+            close_old_connections()
+            cache.delete(self._get_lock_key(product_id))
+            with _refreshing_lock:
+                _refreshing.discard(product_id)
+
+    def _rebuild_product_images(self, product_id: int, version, stale_images: Optional[List[dict]] = None,
+                                force_refresh: bool = False, image_keys: Optional[List[str]] = None,
+                                metadata_by_key: Optional[Dict[str, dict]] = None,
+                                list_if_missing: bool = False) -> List[dict]:
+        """
+        Rebuild a product's cache entry with single-flight coalescing.
+
+        Threads in this process queue on a per-product lock, and workers
+        across processes compete for a short lease in the shared cache. Only
+        the lease holder lists and signs. The others serve stale images when
+        they have them, without waiting for either lock, or wait up to
+        S3_IMAGE_REBUILD_WAIT seconds for the holder's entry before falling
+        back to fetching it themselves.
+
+        Args:
+            product_id: The ID of the product
+            version: Version stamp read before the rebuild started
+            stale_images: Still-valid images to serve if another worker is rebuilding
+            force_refresh: If True, only reuse an entry rebuilt since version was read
+            image_keys: Keys already read from the manifest, if any
+            metadata_by_key: Manifest metadata read along with image_keys, by key
+            list_if_missing: If True, list S3 when image_keys is empty
+
+        Returns:
+            List of dictionaries containing image data with presigned URLs
+        """
+        serve_stale = stale_images is not None and not force_refresh
         cache_key = self._get_cache_key(product_id)
-        
-        # Skip cache if force_refresh is True
-        if not force_refresh:
-            # Try to get from cache first
-            cached_data = cache.get(cache_key)
-            
-            if cached_data and self._is_cache_valid(cached_data):
-                logger.debug(f"Returning cached images for product {product_id}")
-                return cached_data['images']
+        with _product_rebuild_lock(product_id, 0 if serve_stale else self.rebuild_wait) as acquired:
+            # Another thread or worker may have rebuilt it while we waited
+            entry = _l1_cache.get(product_id)
+            if entry is not None and self._is_rebuilt_version(entry.version, version, force_refresh):
+                return entry.images
+            images = self._use_rebuilt_entry(product_id, cache.get(cache_key), version, force_refresh)
+            if images is not None:
+                return images
+
+            if not acquired:
+                logger.debug(f"Images for product {product_id} are being rebuilt by another thread")
+                if serve_stale:
+                    return stale_images
+                return self._build_product_images(
+                    product_id, version, force_refresh, image_keys, metadata_by_key, list_if_missing
+                )
+
+            lock_key = self._get_lock_key(product_id)
+            if cache.add(lock_key, 1, timeout=self.refresh_lock_timeout):
+                try:
+                    return self._build_product_images(
+                        product_id, version, force_refresh, image_keys, metadata_by_key, list_if_missing
+                    )
+                finally:
+                    cache.delete(lock_key)
+
+            logger.debug(f"Images for product {product_id} are being rebuilt by another worker")
+            if serve_stale:
+                return stale_images
+
+            deadline = time.monotonic() + self.rebuild_wait
+            while time.monotonic() < deadline:
+                time.sleep(self.rebuild_poll_interval)
+                cached = cache.get_many([cache_key, lock_key])
+                images = self._use_rebuilt_entry(product_id, cached.get(cache_key), version, force_refresh)
+                if images is not None:
+                    return images
+                if lock_key not in cached:
+                    # The lease holder gave up without publishing an entry
+                    break
+
+            return self._build_product_images(
+                product_id, version, force_refresh, image_keys, metadata_by_key, list_if_missing
+            )
+
+    def _build_product_images(self, product_id: int, version, force_refresh: bool,
+                              image_keys: Optional[List[str]], metadata_by_key: Optional[Dict[str, dict]],
+                              list_if_missing: bool) -> List[dict]:
+        """
+        Fetch a product's images and store them in both cache tiers
+
+        A forced rebuild stores its entry under a new version stamp, so that
+        callers waiting on it can tell it from the entry they were refreshing.
+        """
+        cache_data, timeout = self._fetch_product_images(
+            product_id, image_keys, metadata_by_key, list_if_missing
+        )
+        if force_refresh:
+            version = time.time_ns()
+            self._store_cache_entry(product_id, cache_data, timeout, version)
+            cache.set(self._get_version_key(product_id), version, timeout=None)
         else:
-            logger.debug(f"Force refresh requested for product {product_id}, bypassing cache")
-        
-        # Cache miss, expired, or force refresh - fetch from S3
-        logger.debug(f"Fetching images from S3 for product {product_id}")
-        
+            self._store_cache_entry(product_id, cache_data, timeout, version)
+        return cache_data['images']
+
+    @staticmethod
+    def _is_rebuilt_version(candidate, version, force_refresh: bool) -> bool:
+        """
+        Check if an entry's version stamp lets a rebuild reuse it
+
+        A normal rebuild takes an entry built under the stamp it started from
+        or a later one. A forced rebuild only takes a later one.
+        """
+        if candidate == version:
+            return not force_refresh
+        return candidate is not None and (version is None or candidate > version)
+
+    def _use_rebuilt_entry(self, product_id: int, entry, version, force_refresh: bool) -> Optional[List[dict]]:
+        """
+        Decode a shared-cache entry built by another caller, if a rebuild may reuse it
+
+        Returns:
+            The entry's images, also copied to L1, or None
+        """
+        header = _read_cache_entry_header(entry)
+        if header is None or not self._is_rebuilt_version(header[0], version, force_refresh):
+            return None
+        if self._get_cache_state(header[1]) != 'fresh':
+            return None
+        return self._set_l1_from_entry(product_id, entry, header)
+
+    def _set_l1_from_entry(self, product_id: int, entry: tuple, header: tuple) -> List[dict]:
+        """Decode a fresh shared-cache entry and keep its images in L1"""
+        images = _decode_cache_entry(entry)
+        _l1_cache.set(product_id, images, header[0], self._get_l1_expiry(header[1], header[2]))
+        return images
+
+    def _read_cached_images(self, product_ids: List[int]) -> Tuple[Dict[int, List[dict]], dict, dict]:
+        """
+        Look up products in the L1 and L2 caches.
+
+        L1 entries whose version stamp was confirmed within the last
+        S3_IMAGE_L1_VERSION_CHECK_INTERVAL seconds are served without touching
+        L2. All other stamps, and the L2 entries for L1 misses, are read with
+        a single get_many.
+
+        Returns:
+            Tuple of (images found by product ID, current version stamps,
+            stale images that may be served while another worker rebuilds)
+        """
+        reads = self._iter_cache_reads(product_ids)
         try:
-            # List all images for this product
-            image_keys = self._list_product_images(product_id)
-            
-            if not image_keys:
-                # No images found for this product - use default image
-                logger.debug(f"No images found for product {product_id}, using default image")
-                default_image = self._get_default_image()
-                default_images = [default_image]
-                
-                # Cache the default image result for shorter time
-                cache_data = {
-                    'images': default_images,
-                    'cached_at': datetime.now(),
-                    'is_default': True
-                }
-                
-                cache.set(cache_key, cache_data, timeout=300)  # 5 minutes for default image
-                return default_images
-            
-            # Generate presigned URLs for actual product images
-            presigned_urls = self._generate_presigned_urls(image_keys)
-            
-            # Cache the results
-            cache_data = {
-                'images': presigned_urls,
-                'cached_at': datetime.now(),
-                'is_default': False
-            }
-            
-            cache.set(cache_key, cache_data, timeout=self.cache_timeout)
-            
-            return presigned_urls
-            
-        except Exception as e:
-            logger.error(f"Error fetching images for product {product_id}: {e}")
-            # Return default image as fallback on error
+            keys = next(reads)
+            while True:
+                keys = reads.send(cache.get_many(keys))
+        except StopIteration as done:
+            results, versions, stale, refreshes = done.value
+        for product_id in refreshes:
+            self._schedule_refresh(product_id)
+        return results, versions, stale
+
+    async def _aread_cached_images(self, product_ids: List[int]) -> Tuple[Dict[int, List[dict]], dict, dict]:
+        """Async variant of _read_cached_images, reading L2 with aget_many"""
+        reads = self._iter_cache_reads(product_ids)
+        try:
+            keys = next(reads)
+            while True:
+                keys = reads.send(await cache.aget_many(keys))
+        except StopIteration as done:
+            results, versions, stale, refreshes = done.value
+        refresh_executor = _get_refresh_executor()
+        for product_id in refreshes:
+            # Claims the refresh lock in the shared cache off the event loop
+            refresh_executor.submit(self._schedule_refresh, product_id)
+        return results, versions, stale
+
+    def _iter_cache_reads(self, product_ids: List[int]):
+        """
+        Cache lookup logic shared by _read_cached_images and its async variant
+
+        A generator that yields each list of L2 keys it needs and is sent
+        back the get_many result, so the sync and async lookups only differ
+        in how they read the shared cache.
+
+        Returns:
+            Tuple of (images by product ID, version stamps, stale images,
+            product IDs whose stale entries should be refreshed)
+        """
+        results = {}
+        versions = {}
+        stale = {}
+        now = time.time()
+        l1_unchecked = {}
+        l2_keys = []
+
+        for product_id in product_ids:
+            entry = _l1_cache.get(product_id)
+            if entry is not None and now - entry.checked_at < self.l1_version_check_interval:
+                results[product_id] = entry.images
+                continue
+            if entry is not None:
+                l1_unchecked[product_id] = entry
+            else:
+                l2_keys.append(self._get_cache_key(product_id))
+            l2_keys.append(self._get_version_key(product_id))
+
+        cached = (yield l2_keys) if l2_keys else {}
+        l2_lookups = []
+        for product_id in product_ids:
+            if product_id in results:
+                continue
+            version = cached.get(self._get_version_key(product_id))
+            versions[product_id] = version
+            entry = l1_unchecked.get(product_id)
+            if entry is None:
+                l2_lookups.append(product_id)
+            elif entry.version == version:
+                entry.checked_at = now
+                results[product_id] = entry.images
+            else:
+                # Invalidated by another process since it was cached here
+                _l1_cache.delete(product_id)
+                l2_lookups.append(product_id)
+
+        # L2 entries for L1 entries that turned out to be stale
+        stale_keys = [self._get_cache_key(product_id) for product_id in l2_lookups if product_id in l1_unchecked]
+        if stale_keys:
+            cached.update((yield stale_keys))
+
+        l2_hits = 0
+        refreshes = []
+        for product_id in l2_lookups:
+            entry = cached.get(self._get_cache_key(product_id))
+            header = _read_cache_entry_header(entry)
+            if header is None or header[0] != versions[product_id]:
+                continue
+            # Freshness comes from the entry header, images are only decoded when used
+            state = self._get_cache_state(header[1])
+            if state == 'fresh':
+                logger.debug(f"Returning cached images for product {product_id}")
+                results[product_id] = self._set_l1_from_entry(product_id, entry, header)
+                l2_hits += 1
+            elif state == 'stale' and self.stale_while_revalidate:
+                # Serve the still-valid URLs now and refresh them off-request
+                logger.debug(f"Returning stale images for product {product_id}")
+                results[product_id] = _decode_cache_entry(entry)
+                refreshes.append(product_id)
+                l2_hits += 1
+            elif state == 'stale':
+                stale[product_id] = _decode_cache_entry(entry)
+
+        _record_cache_stats(
+            l1_hits=len(product_ids) - len(l2_lookups),
+            l1_misses=len(l2_lookups),
+            l2_hits=l2_hits,
+            l2_misses=len(l2_lookups) - l2_hits,
+        )
+        return results, versions, stale, refreshes
+
+    def get_images_for_products(self, product_ids: Iterable[int], force_refresh: bool = False) -> Dict[int, List[dict]]:
+        """
+        Get images for many products at once.
+
+        Entries are served from the in-process L1 cache when possible, and the
+        rest are read from Django's cache with a single multi-get. Misses are
+        fetched from S3 concurrently on a bounded thread pool and written back
+        with set_many, so a page of N products costs at most one cache round
+        trip instead of N.
+
+        Args:
+            product_ids: IDs of the products to resolve
+            force_refresh: If True, bypass cache and fetch fresh data from S3
+
+        Returns:
+            Dictionary mapping each product ID to its list of image data
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return {}
+
+        results, misses, fetch = self._plan_image_lookup(product_ids, force_refresh)
+        if not misses:
+            return results
+
+        if len(misses) == 1:
+            fetched = [fetch(misses[0])]
+        else:
+            max_workers = min(self.fetch_workers, len(misses))
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                fetched = list(executor.map(fetch, misses))
+
+        results.update(fetched)
+        return results
+
+    async def aget_images_for_products(self, product_ids: Iterable[int],
+                                       force_refresh: bool = False) -> Dict[int, List[dict]]:
+        """
+        Async variant of get_images_for_products
+
+        Cache reads use aget_many and the manifest query the async ORM, so
+        the event loop is only handed off for the duration of each call.
+        Misses are then rebuilt (listed and signed) concurrently with
+        asyncio.gather, at most S3_IMAGE_ASYNC_FETCH_CONCURRENCY at a time per
+        call, on a process-wide thread pool instead of one created per call.
+
+        Args:
+            product_ids: IDs of the products to resolve
+            force_refresh: If True, bypass cache and fetch fresh data from S3
+
+        Returns:
+            Dictionary mapping each product ID to its list of image data
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return {}
+
+        results, misses, fetch = await self._aplan_image_lookup(product_ids, force_refresh)
+        if not misses:
+            return results
+
+        loop = asyncio.get_running_loop()
+        executor = _get_async_fetch_executor()
+        semaphore = asyncio.Semaphore(self.async_fetch_concurrency)
+
+        async def bounded_fetch(product_id):
+            async with semaphore:
+                return await loop.run_in_executor(executor, fetch, product_id)
+
+        results.update(await asyncio.gather(*(bounded_fetch(product_id) for product_id in misses)))
+        return results
+
+    def _plan_image_lookup(self, product_ids: List[int], force_refresh: bool):
+        """
+        Serve what the caches hold and prepare the rebuild of everything else
+
+        The sync and async lookups only differ in how they run the returned
+        fetch function over the misses.
+
+        Args:
+            product_ids: Unique IDs of the products to resolve
+            force_refresh: If True, bypass cache and fetch fresh data from S3
+
+        Returns:
+            Tuple of (images by product ID served from cache, IDs still
+            missing, fetch function returning (product_id, images) for one miss)
+        """
+        if force_refresh:
+            logger.debug(f"Force refresh requested for products {product_ids}, bypassing cache")
+            results, stale = {}, {}
+            versions = self._get_versions(product_ids, cache.get_many(self._get_version_keys(product_ids)))
+        else:
+            results, versions, stale = self._read_cached_images(product_ids)
+
+        misses = [product_id for product_id in product_ids if product_id not in results]
+        if not misses:
+            return results, misses, None
+
+        logger.debug(f"Fetching images for {len(misses)} of {len(product_ids)} products")
+
+        # One manifest query for every miss, before fanning out
+        metadata_by_key = {}
+        keys_by_product = (
+            self._get_manifest_keys(misses, metadata_by_key) if self.image_source == 'manifest' else {}
+        )
+        return results, misses, self._get_miss_fetcher(
+            versions, stale, force_refresh, keys_by_product, metadata_by_key
+        )
+
+    async def _aplan_image_lookup(self, product_ids: List[int], force_refresh: bool):
+        """Async variant of _plan_image_lookup"""
+        if force_refresh:
+            logger.debug(f"Force refresh requested for products {product_ids}, bypassing cache")
+            results, stale = {}, {}
+            versions = self._get_versions(product_ids, await cache.aget_many(self._get_version_keys(product_ids)))
+        else:
+            results, versions, stale = await self._aread_cached_images(product_ids)
+
+        misses = [product_id for product_id in product_ids if product_id not in results]
+        if not misses:
+            return results, misses, None
+
+        logger.debug(f"Fetching images for {len(misses)} of {len(product_ids)} products")
+
+        metadata_by_key = {}
+        keys_by_product = (
+            await self._aget_manifest_keys(misses, metadata_by_key) if self.image_source == 'manifest' else {}
+        )
+        return results, misses, self._get_miss_fetcher(
+            versions, stale, force_refresh, keys_by_product, metadata_by_key
+        )
+
+    def _get_version_keys(self, product_ids: List[int]) -> List[str]:
+        """Version stamp keys of several products"""
+        return [self._get_version_key(product_id) for product_id in product_ids]
+
+    def _get_versions(self, product_ids: List[int], cached: dict) -> dict:
+        """Map product IDs to the version stamps found in a get_many of _get_version_keys"""
+        versions = {}
+        for product_id in product_ids:
+            version_key = self._get_version_key(product_id)
+            if version_key in cached:
+                versions[product_id] = cached[version_key]
+        return versions
+
+    def _get_miss_fetcher(self, versions: dict, stale: dict, force_refresh: bool,
+                          keys_by_product: Dict[int, List[str]], metadata_by_key: Dict[str, dict]):
+        """
+        Build the function that rebuilds one cache miss of a lookup plan
+
+        Returns:
+            Function taking a product ID and returning (product_id, images),
+            the fallback images if the rebuild fails
+        """
+        # Products without manifest rows are listed by their rebuild instead
+        list_if_missing = self.image_source == 'manifest' and self.manifest_list_fallback
+
+        def fetch(product_id):
             try:
-                default_image = self._get_default_image()
-                return [default_image]
-            except Exception as fallback_error:
-                logger.error(f"Error getting default image as fallback: {fallback_error}")
-                return []
+                return product_id, self._rebuild_product_images(
+                    product_id,
+                    versions.get(product_id),
+                    stale_images=stale.get(product_id),
+                    force_refresh=force_refresh,
+                    image_keys=keys_by_product.get(product_id),
+                    metadata_by_key=metadata_by_key,
+                    list_if_missing=list_if_missing
+                )
+            except Exception as e:
+                logger.error(f"Error fetching images for product {product_id}: {e}")
+                # Return default image as fallback on error
+                return product_id, self._get_fallback_images()
+
+        return fetch
+    
+    def warm_product_images(self, product_ids: Iterable[int],
+                            image_keys_by_product: Optional[Dict[int, List[str]]] = None) -> int:
+        """
+        Rebuild and store cache entries for many products at once
+
+        Used by the warm_image_cache command. Keys are read with one manifest
+        query (or concurrent S3 listings), entries are built concurrently on a
+        thread pool bounded by S3_IMAGE_FETCH_WORKERS, and all entries are
+        written to the shared cache with set_many.
+
+        Args:
+            product_ids: IDs of the products to warm
+            image_keys_by_product: Image keys already known per product, e.g.
+                from a bucket-wide listing. Products missing from it have no images.
+
+        Returns:
+            Number of cache entries written
+        """
+        product_ids = list(dict.fromkeys(product_ids))
+        if not product_ids:
+            return 0
+
+        versions = self._get_versions(product_ids, cache.get_many(self._get_version_keys(product_ids)))
+
+        metadata_by_key = {}
+        if image_keys_by_product is None:
+            if self.image_source == 'manifest':
+                image_keys_by_product = self._get_manifest_keys(product_ids, metadata_by_key)
+                unrecorded = [product_id for product_id, keys in image_keys_by_product.items() if not keys]
+                if unrecorded and self.manifest_list_fallback:
+                    image_keys_by_product.update(self.list_images_for_products(unrecorded))
+            else:
+                image_keys_by_product = self.list_images_for_products(product_ids)
+
+        def fetch(product_id):
+            try:
+                return product_id, self._fetch_product_images(
+                    product_id,
+                    image_keys_by_product.get(product_id, []),
+                    metadata_by_key
+                )
+            except Exception as e:
+                logger.error(f"Error warming images for product {product_id}: {e}")
+                return product_id, None
+
+        with ThreadPoolExecutor(max_workers=min(self.fetch_workers, len(product_ids))) as executor:
+            fetched = list(executor.map(fetch, product_ids))
+
+        # Group entries by timeout so each group is a single set_many
+        entries_by_timeout = defaultdict(dict)
+        url_layout = self._get_url_layout()
+        for product_id, result in fetched:
+            if result is None:
+                continue
+            cache_data, timeout = result
+            entry = _encode_cache_entry(cache_data['images'], versions.get(product_id), *url_layout, timeout=timeout)
+            entries_by_timeout[timeout][self._get_cache_key(product_id)] = entry
+            _l1_cache.set(
+                product_id,
+                cache_data['images'],
+                versions.get(product_id),
+                self._get_l1_expiry(entry[2], entry[3])
+            )
+
+        for timeout, entries in entries_by_timeout.items():
+            cache.set_many(entries, timeout=timeout)
+
+        return sum(len(entries) for entries in entries_by_timeout.values())
     
     def invalidate_product_cache(self, product_id: int):
-        """Invalidate cache for a specific product"""
+        """
+        Invalidate cache for a specific product
+
+        Deletes the shared entry and bumps the product's version stamp, which
+        makes every process drop its in-process copy on the next stamp check.
+        """
         cache_key = self._get_cache_key(product_id)
         cache.delete(cache_key)
+        stamp = time.time_ns()
+        cache.set_many(
+            {self._get_version_key(product_id): stamp, CATALOG_VERSION_KEY: stamp},
+            timeout=None
+        )
+        _l1_cache.delete(product_id)
         logger.info(f"Cache invalidated for product {product_id}")
     
-    def upload_product_image(self, product_id: int, image_file, filename: str) -> bool:
+    def upload_product_image(self, product_id: int, image_file, filename: str, invalidate: bool = True,
+                             position: Optional[int] = None) -> bool:
         """
         Upload an image for a product to S3
         
@@ -208,22 +1665,55 @@ class S3ImageService:
             product_id: The ID of the product
             image_file: The image file object
             filename: The filename to use in S3
+            invalidate: If False, leave cache invalidation to the caller (e.g.
+                once per product after a batch of uploads)
+            position: Display position to record; by default a new image is
+                placed after the product's existing images
             
         Returns:
             True if successful, False otherwise
         """
         try:
             s3_key = f"{product_id}/{filename}"
+            content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            size = self._get_file_size(image_file)
+            width, height = self._read_image_dimensions(image_file)
+            placeholder = self._render_placeholder(image_file)
+            # Rendered before the upload, which closes image_file
+            rendered_variants = self._render_variants(s3_key, image_file)
             
+            # Upload the original first so a failed upload never leaves variants behind
             self.s3_client.upload_fileobj(
                 image_file,
                 self.bucket_name,
                 s3_key,
-                ExtraArgs={'ACL': 'public-read'}
+                ExtraArgs={'ACL': 'public-read', 'ContentType': content_type},
+                Config=self.transfer_config
             )
+            variants = self._upload_variants(s3_key, rendered_variants)
+            
+            fields = {} if position is None else {'position': position}
+            try:
+                self.record_product_image(
+                    product_id,
+                    s3_key,
+                    size=size,
+                    etag=self._get_object_etag(s3_key),
+                    content_type=content_type,
+                    width=width,
+                    height=height,
+                    placeholder=placeholder,
+                    variants=variants,
+                    **fields
+                )
+            except Exception:
+                # The original is picked up by reconcile_image_manifest; variants would be orphaned
+                self._delete_objects([variant['key'] for variant in variants.values()])
+                raise
             
             # Invalidate cache for this product
-            self.invalidate_product_cache(product_id)
+            if invalidate:
+                self.invalidate_product_cache(product_id)
             
             logger.info(f"Successfully uploaded {filename} for product {product_id}")
             return True
@@ -232,6 +1722,186 @@ class S3ImageService:
             logger.error(f"Error uploading image {filename} for product {product_id}: {e}")
             return False
     
+    def _get_file_size(self, image_file) -> int:
+        """Return the size of a file object in bytes, leaving it at the start"""
+        image_file.seek(0, os.SEEK_END)
+        size = image_file.tell()
+        image_file.seek(0)
+        return size
+
+    def _read_image_dimensions(self, image_file) -> Tuple[Optional[int], Optional[int]]:
+        """Read width and height from an image header, leaving the file at the start"""
+        try:
+            with Image.open(image_file) as image:
+                return image.size
+        except Exception as e:
+            logger.warning(f"Could not read image dimensions: {e}")
+            return None, None
+        finally:
+            image_file.seek(0)
+
+    def _render_placeholder(self, image_file) -> str:
+        """
+        Encode a tiny preview of an image as a data URI
+
+        The preview is S3_IMAGE_PLACEHOLDER_WIDTH pixels wide, a few hundred
+        bytes, and meant to be shown blurred while the real image loads.
+
+        Returns:
+            'data:image/webp;base64,...', or '' if the image cannot be read
+        """
+        try:
+            with Image.open(image_file) as original:
+                preview = ImageOps.exif_transpose(original).convert('RGB')
+                height = max(1, round(preview.height * self.placeholder_width / preview.width))
+                preview = preview.resize((self.placeholder_width, height), Image.BILINEAR)
+                buffer = BytesIO()
+                preview.save(buffer, format='WEBP', quality=30)
+            return f"data:image/webp;base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+        except Exception as e:
+            logger.warning(f"Could not render placeholder: {e}")
+            return ''
+        finally:
+            image_file.seek(0)
+
+    def _get_variant_key(self, s3_key: str, name: str) -> str:
+        """S3 key of a variant, kept outside the "<product_id>/" prefix of the originals"""
+        extension = 'jpg' if self.variant_format == 'jpeg' else self.variant_format
+        return f"{self.variant_prefix}/{s3_key}/{name}.{extension}"
+
+    def _render_variants(self, s3_key: str, image_file) -> List[Tuple[str, bytes, int, int]]:
+        """
+        Resize an image to every configured variant width with Pillow
+
+        Failures are logged and leave the image without variants, so the
+        original upload still goes through.
+
+        Args:
+            s3_key: The S3 key of the original image
+            image_file: The original image file object, left at the start
+
+        Returns:
+            List of (variant name, encoded bytes, width, height)
+        """
+        if not self.variants:
+            return []
+        try:
+            with Image.open(image_file) as original:
+                original = ImageOps.exif_transpose(original)
+                if self.variant_format == 'jpeg':
+                    original = original.convert('RGB')
+                elif original.mode not in ('RGB', 'RGBA'):
+                    original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+                rendered = []
+                for name, max_width in self.variants.items():
+                    width = min(max_width, original.width)
+                    height = max(1, round(original.height * width / original.width))
+                    resized = original if width == original.width else original.resize(
+                        (width, height), Image.LANCZOS
+                    )
+                    buffer = BytesIO()
+                    resized.save(buffer, format=self.variant_format.upper(), quality=self.variant_quality)
+                    rendered.append((name, buffer.getvalue(), width, height))
+                return rendered
+        except Exception as e:
+            logger.warning(f"Could not generate variants for {s3_key}: {e}")
+            return []
+        finally:
+            image_file.seek(0)
+
+    def upload_image_variants(self, s3_key: str, image_file) -> Dict[str, dict]:
+        """
+        Generate the resized variants of an image and upload them to S3
+
+        Failures are logged and leave the image without variants, so the
+        original upload still goes through.
+
+        Args:
+            s3_key: The S3 key of the original image
+            image_file: The original image file object, left at the start
+
+        Returns:
+            Manifest variants by name ({'key', 'width', 'height', 'size', 'content_type'})
+        """
+        return self._upload_variants(s3_key, self._render_variants(s3_key, image_file))
+
+    def _upload_variants(self, s3_key: str, rendered: List[Tuple[str, bytes, int, int]]) -> Dict[str, dict]:
+        """Upload variants rendered by _render_variants, returning them as manifest variants by name"""
+        content_type = f"image/{self.variant_format}"
+        try:
+            variants = {}
+            for name, data, width, height in rendered:
+                variant_key = self._get_variant_key(s3_key, name)
+                self.s3_client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=variant_key,
+                    Body=data,
+                    ACL='public-read',
+                    ContentType=content_type
+                )
+                variants[name] = {
+                    'key': variant_key,
+                    'width': width,
+                    'height': height,
+                    'size': len(data),
+                    'content_type': content_type,
+                }
+            return variants
+        except Exception as e:
+            logger.warning(f"Could not upload variants for {s3_key}: {e}")
+            return {}
+
+    def _get_object_etag(self, s3_key: str) -> str:
+        """Fetch the ETag of an uploaded object, or '' if it cannot be read"""
+        try:
+            response = self.s3_client.head_object(Bucket=self.bucket_name, Key=s3_key)
+            return response['ETag'].strip('"')
+        except ClientError as e:
+            logger.warning(f"Could not read ETag for {s3_key}: {e}")
+            return ''
+
+    def _delete_objects(self, keys: List[str]):
+        """Delete several objects from S3 with one request"""
+        if keys:
+            self.s3_client.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={'Objects': [{'Key': key} for key in keys], 'Quiet': True}
+            )
+
+    def record_product_image(self, product_id: int, s3_key: str, **fields) -> ProductImage:
+        """
+        Create or update the manifest entry for an image
+
+        New images are placed after the product's existing images and
+        updates keep their position, unless a position is passed in fields.
+
+        Args:
+            product_id: The ID of the product
+            s3_key: The S3 key of the image
+            **fields: ProductImage fields to set (size, etag, content_type, width, height, ...)
+
+        Returns:
+            The saved ProductImage
+        """
+        with transaction.atomic():
+            record = ProductImage.objects.select_for_update().filter(key=s3_key).first()
+            if record is None:
+                last_position = (
+                    ProductImage.objects.filter(product_id=product_id)
+                    .aggregate(last=Max('position'))['last']
+                )
+                record = ProductImage(
+                    product_id=product_id,
+                    key=s3_key,
+                    position=0 if last_position is None else last_position + 1
+                )
+            record.filename = s3_key.split('/')[-1]
+            for name, value in fields.items():
+                setattr(record, name, value)
+            record.save()
+        return record
+    
     def delete_product_image(self, product_id: int, filename: str) -> bool:
         """
         Delete an image for a product from S3
@@ -245,11 +1915,15 @@ class S3ImageService:
         """
         try:
             s3_key = f"{product_id}/{filename}"
+            record = ProductImage.objects.filter(key=s3_key).first()
+            variant_keys = [variant['key'] for variant in record.variants.values()] if record else []
             
             self.s3_client.delete_object(
                 Bucket=self.bucket_name,
                 Key=s3_key
             )
+            self._delete_objects(variant_keys)
+            ProductImage.objects.filter(key=s3_key).delete()
             
             # Invalidate cache for this product
             self.invalidate_product_cache(product_id)
@@ -269,18 +1943,39 @@ class S3ImageService:
             Dictionary containing default image data with presigned URL
         """
         try:
-            presigned_url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': self.default_image_key},
-                ExpiresIn=self.presigned_url_expiration
-            )
+            signer = None
+            if self.url_mode == 'presigned':
+                signer = get_presigned_url_signer(self.s3_client, self.bucket_name)
+
+            if self.url_mode != 'presigned':
+                presigned_url = self._build_public_url(self.default_image_key)
+                expires_at = None
+            elif signer is not None:
+                signed_at, expires_in, expires_at = self._get_signing_time()
+                presigned_url = signer.generate_presigned_urls(
+                    [self.default_image_key],
+                    expires_in,
+                    now=signed_at
+                )[0]
+            else:
+                presigned_url = self.s3_client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': self.bucket_name, 'Key': self.default_image_key},
+                    ExpiresIn=self.presigned_url_expiration
+                )
+                expires_at = datetime.now() + timedelta(seconds=self.presigned_url_expiration)
             
             return {
                 'url': presigned_url,
                 'filename': self.default_image_key,
                 'key': self.default_image_key,
-                'expires_at': datetime.now() + timedelta(seconds=self.presigned_url_expiration),
-                'is_default': True
+                'expires_at': expires_at,
+                'is_default': True,
+                'width': None,
+                'height': None,
+                'size': None,
+                'placeholder': None,
+                'variants': {}
             }
         except ClientError as e:
             logger.error(f"Error generating presigned URL for default image {self.default_image_key}: {e}")
@@ -291,6 +1986,11 @@ class S3ImageService:
                 'key': self.default_image_key,
                 'expires_at': datetime.now() + timedelta(seconds=self.presigned_url_expiration),
                 'is_default': True,
+                'width': None,
+                'height': None,
+                'size': None,
+                'placeholder': None,
+                'variants': {},
                 'error': 'Default image not found'
             }
         except Exception as e:
@@ -301,5 +2001,10 @@ class S3ImageService:
                 'key': self.default_image_key,
                 'expires_at': datetime.now() + timedelta(seconds=self.presigned_url_expiration),
                 'is_default': True,
+                'width': None,
+                'height': None,
+                'size': None,
+                'placeholder': None,
+                'variants': {},
                 'error': str(e)
             }
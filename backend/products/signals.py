@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import AmigurumiProduct, get_search_vector
+from .services import bump_catalog_version
+
+
+@receiver(post_save, sender=AmigurumiProduct)
+def update_search_vector(sender, instance, update_fields=None, **kwargs):
+    """Refresh the product's search document when its name or description may have changed"""
+    if update_fields is not None and not {'name', 'description'} & set(update_fields):
+        return
+    # update() skips save(), so this neither recurses nor touches updated_at
+    AmigurumiProduct.objects.filter(pk=instance.pk).update(search_vector=get_search_vector())
+
+
+@receiver(post_save, sender=AmigurumiProduct)
+@receiver(post_delete, sender=AmigurumiProduct)
+def product_changed(sender, instance, **kwargs):
+    """Orphan cached catalog responses whenever a product is saved or deleted"""
+    bump_catalog_version()
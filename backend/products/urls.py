@@ -5,5 +5,11 @@ urlpatterns = [
     path('products/', views.AmigurumiProductListView.as_view(), name='product-list'),
     path('products/<int:pk>/', views.AmigurumiProductDetailView.as_view(), name='product-detail'),
     path('products/featured/', views.featured_products, name='featured-products'),
+    path('products/search/', views.product_search, name='product-search'),
     path('products/category/<str:category>/', views.products_by_category, name='products-by-category'),
+    # Async variants, for deployments served through amigurumi_store.asgi
+    path('async/products/', views.async_product_list, name='async-product-list'),
+    path('async/products/<int:pk>/', views.async_product_detail, name='async-product-detail'),
+    path('async/products/featured/', views.async_featured_products, name='async-featured-products'),
+    path('async/products/category/<str:category>/', views.async_products_by_category, name='async-products-by-category'),
 ]
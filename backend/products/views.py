@@ -1,41 +1,476 @@
+import hashlib
+import time
+from typing import Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse, HttpResponseNotAllowed
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 from rest_framework import generics
-from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
 from .models import AmigurumiProduct
-from .serializers import AmigurumiProductSerializer
+from .pagination import ProductCursorPagination, ProductSearchPagination
+from .renderers import ORJSONRenderer
+from .search import ProductSearch
+from .serializers import (
+    AmigurumiProductSerializer,
+    ProductSearchParamsSerializer,
+    _get_force_refresh,
+    get_product_value_fields,
+    requests_images,
+    serialize_product_rows,
+)
+from .services import S3ImageService, _get_min_expires_at, aget_catalog_version, get_catalog_version
+
+RESPONSE_CACHE_KEY_PREFIX = "products:response"
+
+# The newest updated_at and row count that response validators are built from
+VALIDATOR_AGGREGATES = {'last_modified': Max('updated_at'), 'count': Count('id')}
+
+
+def _get_validators(request, queryset, product_id=None):
+    """
+    Derive the ETag, Last-Modified and max-age of a response
+
+    Nothing is serialized: one aggregate query for the newest updated_at and
+    row count of the queryset, the catalog version stamp (the product's image
+    stamp for detail responses), and the current URL epoch so that responses
+    carrying presigned URLs go stale before the URLs expire.
+
+    Args:
+        request: Incoming request
+        queryset: Rows the response is built from
+        product_id: Product of a detail response; None for catalog responses
+
+    Returns:
+        Tuple of (etag, last_modified, max_age), or None when the response
+        must not be reused
+    """
+    if _get_force_refresh({'request': request}):
+        return None
+
+    service = S3ImageService()
+    max_age = service.get_response_max_age()
+    if not max_age:
+        return None
+
+    stats = queryset.order_by().aggregate(**VALIDATOR_AGGREGATES)
+    if product_id is not None and not stats['count']:
+        # Let the view produce its 404
+        return None
+
+    if product_id is None:
+        images_version = get_catalog_version()
+    else:
+        images_version = service.get_images_version(product_id)
+    return _build_validators(request, service, max_age, stats, images_version)
+
+
+async def _aget_validators(request, queryset, product_id=None):
+    """Async variant of _get_validators"""
+    if _get_force_refresh({'request': request}):
+        return None
+
+    service = S3ImageService()
+    max_age = service.get_response_max_age()
+    if not max_age:
+        return None
+
+    stats = await queryset.order_by().aaggregate(**VALIDATOR_AGGREGATES)
+    if product_id is not None and not stats['count']:
+        return None
+
+    if product_id is None:
+        images_version = await aget_catalog_version()
+    else:
+        images_version = await service.aget_images_version(product_id)
+    return _build_validators(request, service, max_age, stats, images_version)
+
+
+def _build_validators(request, service, max_age, stats, images_version):
+    """Build the (etag, last_modified, max_age) of _get_validators from what it read"""
+    url_epoch = service.get_url_epoch(max_age)
+    last_modified = max(
+        int(stats['last_modified'].timestamp()) if stats['last_modified'] else 0,
+        images_version // 1_000_000_000,
+        url_epoch,
+    )
+    validator = '|'.join(str(part) for part in (
+        request.get_full_path(),
+        stats['count'],
+        stats['last_modified'].isoformat() if stats['last_modified'] else '',
+        images_version,
+        url_epoch,
+        service.url_mode,
+    ))
+    # Weak: presigned URLs differ between equivalent responses
+    etag = f'W/"{hashlib.sha1(validator.encode()).hexdigest()}"'
+    return etag, last_modified, max_age
+
+
+def _apply_validators(response, validators):
+    """Set the ETag, Last-Modified and Cache-Control headers from _get_validators"""
+    etag, last_modified, max_age = validators
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def _get_payload_images(data):
+    """Yield every image dict embedded in a serialized product or page of products"""
+    products = data.get('results', [data]) if isinstance(data, dict) else data
+    for product in products:
+        yield from product.get('images') or []
+        if product.get('primary_image'):
+            yield product['primary_image']
+
+
+def _get_response_cache_key(request, media_type: str, catalog_version: Optional[int] = None) -> str:
+    """Build the response cache key from the catalog version, media type and full path"""
+    if catalog_version is None:
+        catalog_version = get_catalog_version()
+    path_hash = hashlib.sha1(f"{media_type}|{request.get_full_path()}".encode()).hexdigest()
+    return f"{RESPONSE_CACHE_KEY_PREFIX}:{catalog_version}:{path_hash}"
+
+
+def _get_response_timeout(data) -> int:
+    """
+    Get how long a rendered response may be cached
+
+    The entry never outlives the refresh buffer of the earliest presigned
+    URL in data.
+    """
+    timeout = getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 300)
+    min_expires_at = _get_min_expires_at(_get_payload_images(data))
+    if min_expires_at is not None:
+        timeout = min(timeout, min_expires_at - int(time.time()) - S3ImageService().refresh_buffer)
+    return timeout
+
+
+def _store_response(cache_key: str, content: bytes, content_type: str, data):
+    """Cache a rendered response body for _get_response_timeout(data) seconds"""
+    timeout = _get_response_timeout(data)
+    if timeout > 0:
+        cache.set(cache_key, (content, content_type), timeout=timeout)
+
+
+async def _astore_response(cache_key: str, content: bytes, content_type: str, data):
+    """Async variant of _store_response"""
+    timeout = _get_response_timeout(data)
+    if timeout > 0:
+        await cache.aset(cache_key, (content, content_type), timeout=timeout)
+
+
+def _iter_response(request, renderer, media_type: str, product_id=None):
+    """
+    Conditional-GET and response cache logic shared by the sync and async views
+
+    A client whose copy is still current gets a 304. Otherwise catalog
+    responses (no product_id) are served from the response cache, keyed by
+    the catalog version, the full path and the media type, so saving or
+    deleting a product and uploading or deleting an image orphan every entry
+    at once. Responses that go out get ETag, Last-Modified and Cache-Control
+    headers.
+
+    Like S3ImageService._iter_cache_reads, this is a generator: it yields
+    each step that touches the database or cache as a tuple and is sent
+    back its result, so _conditional_response and _async_response only
+    differ in how they run those steps:
+        ('validators',): the (etag, last_modified, max_age) of _get_validators
+        ('catalog_version',): the catalog version stamp
+        ('cache_get', key): the cached (content, content_type), or None
+        ('build',): (response, data) of the view, with data None when the
+            response is an error to return as is, and response None when
+            data still has to be rendered
+        ('cache_set', key, content, content_type, data): store a rendered body
+
+    Returns:
+        The response to send
+    """
+    validators = yield ('validators',)
+    if validators is not None:
+        etag, last_modified, _ = validators
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return _apply_validators(response, validators)
+
+    cache_key = None
+    if product_id is None and getattr(settings, 'CATALOG_RESPONSE_CACHE_TIMEOUT', 300):
+        cache_key = _get_response_cache_key(request, media_type, (yield ('catalog_version',)))
+
+    cached = None
+    if cache_key is not None and not _get_force_refresh({'request': request}):
+        cached = yield ('cache_get', cache_key)
+
+    if cached is not None:
+        response = HttpResponse(cached[0], content_type=cached[1])
+    else:
+        response, data = yield ('build',)
+        if data is None:
+            return response
+        if response is None or cache_key is not None:
+            content = renderer.render(data, media_type, {'request': request})
+            content_type = (
+                f"{renderer.media_type}; charset={renderer.charset}" if renderer.charset else renderer.media_type
+            )
+            if cache_key is not None:
+                yield ('cache_set', cache_key, content, content_type, data)
+            response = HttpResponse(content, content_type=content_type)
+
+    return _apply_validators(response, validators) if validators is not None else response
+
+
+def _conditional_response(request, queryset, get_response, product_id=None):
+    """
+    Run _iter_response for a DRF view
+
+    Args:
+        request: Incoming request, after content negotiation
+        queryset: Rows the response is built from
+        get_response: Callable building the view's full response
+        product_id: Product of a detail response; None for catalog
+            responses, which also go through the response cache
+
+    Returns:
+        A 304, the rendered 200, or the view's own response if it was not a 200
+    """
+    steps = _iter_response(request, request.accepted_renderer, request.accepted_media_type, product_id)
+    result = None
+    try:
+        while True:
+            step, *args = steps.send(result)
+            if step == 'validators':
+                result = _get_validators(request, queryset, product_id)
+            elif step == 'catalog_version':
+                result = get_catalog_version()
+            elif step == 'cache_get':
+                result = cache.get(*args)
+            elif step == 'cache_set':
+                result = _store_response(*args)
+            else:
+                response = get_response()
+                result = (response, response.data if response.status_code == 200 else None)
+    except StopIteration as done:
+        return done.value
+
 
 class AmigurumiProductListView(generics.ListAPIView):
     """List all amigurumi products"""
     queryset = AmigurumiProduct.objects.filter(is_available=True)
     serializer_class = AmigurumiProductSerializer
-    
-    def get_serializer_context(self):
-        """Pass request context to serializer for force_refresh support"""
-        context = super().get_serializer_context()
-        context['request'] = self.request
-        return context
+    pagination_class = ProductCursorPagination
+
+    def get(self, request, *args, **kwargs):
+        return _conditional_response(
+            request,
+            self.get_queryset(),
+            lambda: _paginated_response(request, self.get_queryset())
+        )
 
 class AmigurumiProductDetailView(generics.RetrieveAPIView):
     """Get a single amigurumi product"""
     queryset = AmigurumiProduct.objects.filter(is_available=True)
     serializer_class = AmigurumiProductSerializer
-    
+
+    def get(self, request, *args, **kwargs):
+        product_id = self.kwargs[self.lookup_field]
+        return _conditional_response(
+            request,
+            self.get_queryset().filter(pk=product_id),
+            lambda: super(AmigurumiProductDetailView, self).get(request, *args, **kwargs),
+            product_id=product_id
+        )
+
     def get_serializer_context(self):
         """Pass request context to serializer for force_refresh support"""
         context = super().get_serializer_context()
         context['request'] = self.request
         return context
 
+def _paginated_response(request, products):
+    """Serialize one cursor page of products from values() rows"""
+    context = {'request': request}
+    paginator = ProductCursorPagination()
+    page = paginator.paginate_queryset(products.values(*get_product_value_fields(context)), request)
+    return paginator.get_paginated_response(serialize_product_rows(page, context))
+
 @api_view(['GET'])
 def featured_products(request):
     """Get featured amigurumi products"""
     products = AmigurumiProduct.objects.filter(is_featured=True, is_available=True)
-    serializer = AmigurumiProductSerializer(products, many=True, context={'request': request})
-    return Response(serializer.data)
+    return _conditional_response(
+        request,
+        products,
+        lambda: _paginated_response(request, products)
+    )
 
 @api_view(['GET'])
 def products_by_category(request, category):
     """Get products by category"""
     products = AmigurumiProduct.objects.filter(category=category.upper(), is_available=True)
-    serializer = AmigurumiProductSerializer(products, many=True, context={'request': request})
-    return Response(serializer.data)
+    return _conditional_response(
+        request,
+        products,
+        lambda: _paginated_response(request, products)
+    )
+
+
+def _search_response(request, search):
+    """Serialize one page of ranked search results with the facet counts"""
+    context = {'request': request}
+    paginator = ProductSearchPagination()
+    page = paginator.paginate_queryset(search.get_results().values(*get_product_value_fields(context)), request)
+    response = paginator.get_paginated_response(serialize_product_rows(page, context))
+    response.data['facets'] = search.get_facets()
+    return response
+
+@api_view(['GET'])
+def product_search(request):
+    """
+    Full-text search over product names and descriptions
+
+    ``?q=`` takes web search syntax ("quoted phrases", -exclusions, or);
+    ``?category=``, ``?min_price=`` and ``?max_price=`` narrow the results.
+    Results are ranked, paginated with ``?page=``, and come with category
+    and price facets.
+    """
+    params = ProductSearchParamsSerializer(data=request.query_params)
+    params.is_valid(raise_exception=True)
+    search = ProductSearch(
+        query=params.validated_data['q'].strip(),
+        category=params.validated_data.get('category'),
+        min_price=params.validated_data.get('min_price'),
+        max_price=params.validated_data.get('max_price'),
+    )
+    return _conditional_response(
+        request,
+        search.matches,
+        lambda: _search_response(request, search)
+    )
+
+
+# Async (ASGI) variants of the endpoints above. DRF views are synchronous, so
+# these are plain Django async views producing the same JSON, headers and
+# status codes. ORM and cache calls go through the async ORM and async cache
+# API one at a time (the paginator's page query in one sync_to_async call),
+# and the images of a page are resolved concurrently by
+# S3ImageService.aget_images_for_products, which only hands S3 listing and
+# signing to threads.
+
+async def _aresolve_images(rows, context):
+    """Resolve images for values() rows without blocking the event loop"""
+    if not requests_images(context):
+        return {}
+    return await S3ImageService().aget_images_for_products(
+        [row['id'] for row in rows],
+        force_refresh=_get_force_refresh(context)
+    )
+
+
+async def _apaginated_payload(request, products):
+    """Async counterpart of _paginated_response, returning the page as data"""
+    context = {'request': request}
+    paginator = ProductCursorPagination()
+    # The page query is the one ORM call DRF makes itself, so it runs whole in a thread
+    page = await sync_to_async(paginator.paginate_queryset)(
+        products.values(*get_product_value_fields(context)), request
+    )
+    images_by_product = await _aresolve_images(page, context)
+    return {
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'results': serialize_product_rows(page, context, images_by_product),
+    }
+
+
+async def _async_response(request, queryset, get_payload, product_id=None):
+    """
+    Run _iter_response for an async view
+
+    Args:
+        request: Incoming Django request
+        queryset: Rows the response is built from
+        get_payload: Coroutine function taking the DRF request and returning
+            the data to render, or None for a 404
+        product_id: Product of a detail response; None for catalog
+            responses, which also go through the response cache
+
+    Returns:
+        An HttpResponse: 200, 304, 400, 404 or 405
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET'])
+
+    # DRF's Request provides query_params for the shared helpers
+    request = Request(request)
+    renderer = ORJSONRenderer()
+    steps = _iter_response(request, renderer, renderer.media_type, product_id)
+    result = None
+    try:
+        while True:
+            step, *args = steps.send(result)
+            if step == 'validators':
+                result = await _aget_validators(request, queryset, product_id)
+            elif step == 'catalog_version':
+                result = await aget_catalog_version()
+            elif step == 'cache_get':
+                result = await cache.aget(*args)
+            elif step == 'cache_set':
+                result = await _astore_response(*args)
+            else:
+                result = await _aget_payload_response(request, renderer, get_payload)
+    except StopIteration as done:
+        return done.value
+
+
+async def _aget_payload_response(request, renderer, get_payload):
+    """Run get_payload for the 'build' step of _iter_response, turning errors into a 400 or 404"""
+    try:
+        data = await get_payload(request)
+    except ValidationError as exc:
+        return HttpResponse(renderer.render(exc.detail), status=400, content_type=renderer.media_type), None
+    if data is None:
+        return HttpResponse(
+            renderer.render({'detail': 'Not found.'}),
+            status=404,
+            content_type=renderer.media_type
+        ), None
+    return None, data
+
+
+async def async_product_list(request):
+    """List all amigurumi products (async)"""
+    products = AmigurumiProduct.objects.filter(is_available=True)
+    return await _async_response(request, products, lambda drf_request: _apaginated_payload(drf_request, products))
+
+
+async def async_product_detail(request, pk):
+    """Get a single amigurumi product (async)"""
+    products = AmigurumiProduct.objects.filter(is_available=True, pk=pk)
+
+    async def get_payload(drf_request):
+        context = {'request': drf_request}
+        row = await products.values(*get_product_value_fields(context)).afirst()
+        if row is None:
+            return None
+        images_by_product = await _aresolve_images([row], context)
+        return serialize_product_rows([row], context, images_by_product)[0]
+
+    return await _async_response(request, products, get_payload, product_id=pk)
+
+
+async def async_featured_products(request):
+    """Get featured amigurumi products (async)"""
+    products = AmigurumiProduct.objects.filter(is_featured=True, is_available=True)
+    return await _async_response(request, products, lambda drf_request: _apaginated_payload(drf_request, products))
+
+
+async def async_products_by_category(request, category):
+    """Get products by category (async)"""
+    products = AmigurumiProduct.objects.filter(category=category.upper(), is_available=True)
+    return await _async_response(request, products, lambda drf_request: _apaginated_payload(drf_request, products))
@@ -96,9 +96,15 @@ const ProductCard = ({ product }) => {
         {currentImage ? (
           <>
             <img 
-              src={currentImage.url} 
+              src={currentImage.variants?.card?.url || currentImage.url} 
               alt={`${product.name} - ${currentImage.filename}`}
               className="product-image"
+              width={currentImage.width || undefined}
+              height={currentImage.height || undefined}
+              style={currentImage.placeholder ? {
+                backgroundImage: `url(${currentImage.placeholder})`,
+                backgroundSize: 'cover'
+              } : undefined}
               loading="lazy"
               onLoad={handleImageLoad}
               onError={handleImageError}
@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
 import ProductCard from '../components/ProductCard';
-import api from '../services/api';
+import { getAllPages } from '../services/api';
 import './HomePage.css';
 
 const HomePage = () => {
@@ -13,8 +13,7 @@ const HomePage = () => {
     const fetchFeaturedProducts = async () => {
       try {
         setLoading(true);
-        const response = await api.get('/products/featured/');
-        setFeaturedProducts(response.data);
+        setFeaturedProducts(await getAllPages('/products/featured/'));
       } catch (err) {
         setError('Failed to load featured products');
         console.error(err);
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useParams } from 'react-router-dom';
 import ProductCard from '../components/ProductCard';
 import api from '../services/api';
@@ -7,9 +7,13 @@ import './ProductsPage.css';
 const ProductsPage = () => {
   const { category } = useParams();
   const [products, setProducts] = useState([]);
+  const [nextPage, setNextPage] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState(null);
   const [selectedCategory, setSelectedCategory] = useState(category || 'all');
+  const categoryRef = useRef(selectedCategory);
+  categoryRef.current = selectedCategory;
 
   const categories = [
     { id: 'all', name: 'All Products', icon: '🛍️' },
@@ -21,9 +25,13 @@ const ProductsPage = () => {
   ];
 
   useEffect(() => {
+    // Ignore a response that arrives after the category changed again
+    let ignore = false;
+
     const fetchProducts = async () => {
       try {
         setLoading(true);
+        setError(null);
         let url = '/products/';
         
         if (selectedCategory && selectedCategory !== 'all') {
@@ -31,18 +39,46 @@ const ProductsPage = () => {
         }
         
         const response = await api.get(url);
-        setProducts(response.data);
+        if (!ignore) {
+          setProducts(response.data.results);
+          setNextPage(response.data.next);
+        }
       } catch (err) {
-        setError('Failed to load products');
+        if (!ignore) {
+          setError('Failed to load products');
+        }
         console.error(err);
       } finally {
-        setLoading(false);
+        if (!ignore) {
+          setLoading(false);
+        }
       }
     };
 
     fetchProducts();
+    return () => {
+      ignore = true;
+    };
   }, [selectedCategory]);
 
+  const loadMoreProducts = async () => {
+    const requestedCategory = selectedCategory;
+    try {
+      setLoadingMore(true);
+      // `next` is the full URL of the following page
+      const response = await api.get(nextPage);
+      if (categoryRef.current === requestedCategory) {
+        setProducts(current => [...current, ...response.data.results]);
+        setNextPage(response.data.next);
+      }
+    } catch (err) {
+      setError('Failed to load more products');
+      console.error(err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     if (category) {
       setSelectedCategory(category);
@@ -97,7 +133,7 @@ const ProductsPage = () => {
             <>
               <div className="products-info">
                 <p className="products-count">
-                  {products.length} {products.length === 1 ? 'product' : 'products'} found
+                  {products.length} {products.length === 1 ? 'product' : 'products'} {nextPage ? 'shown' : 'found'}
                 </p>
               </div>
               
@@ -106,6 +142,18 @@ const ProductsPage = () => {
                   <ProductCard key={product.id} product={product} />
                 ))}
               </div>
+
+              {nextPage && (
+                <div className="text-center mt-4">
+                  <button
+                    className="btn btn-secondary"
+                    onClick={loadMoreProducts}
+                    disabled={loadingMore}
+                  >
+                    {loadingMore ? 'Loading...' : 'Load More Products'}
+                  </button>
+                </div>
+              )}
             </>
           )}
           
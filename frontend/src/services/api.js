@@ -40,4 +40,16 @@ api.interceptors.response.use(
   }
 );
 
+// Fetch every page of a cursor-paginated list endpoint by following `next`
+export const getAllPages = async (url) => {
+  const results = [];
+  let next = url;
+  while (next) {
+    const response = await api.get(next);
+    results.push(...response.data.results);
+    next = response.data.next;
+  }
+  return results;
+};
+
 export default api;
@@ -15,6 +15,9 @@ echo "⏳ Waiting for LocalStack..."
 echo "🔧 Running Django migrations..."
 python manage.py migrate
 
+# Create the cache table (no-op unless CACHE_BACKEND=database)
+python manage.py createcachetable
+
 # Create superuser if it doesn't exist
 echo "👤 Creating superuser..."
 python manage.py shell -c "
@@ -31,6 +34,10 @@ else:
 echo "📁 Migrating images to S3 and populating database..."
 python migrate_images_to_s3.py || echo "⚠️ S3 migration failed, continuing with local setup..."
 
+# Record images uploaded outside Django in the image manifest
+echo "🗂️ Reconciling image manifest with S3..."
+python manage.py reconcile_image_manifest --apply || echo "⚠️ Manifest reconcile failed, continuing..."
+
 # Start Django development server
 echo "✅ Starting Django server..."
 exec python manage.py runserver 0.0.0.0:8000
@@ -1,83 +1,51 @@
 #!/usr/bin/env python3
 """
 Batch upload script for product images to S3.
-Uploads sample images for products 1-11 using the upload_product_images_to_s3.py script.
+Uploads sample images for products 1-11 using the upload logic from
+upload_product_images_to_s3.py, in-process with one shared S3 client.
 """
 
-import subprocess
 import sys
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-def run_upload_for_product(product_id: int, stack: str = "local") -> bool:
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from upload_product_images_to_s3 import (  # noqa: E402
+    create_bucket_if_not_exists,
+    get_s3_client,
+    upload_image_to_s3,
+)
+
+BUCKET_NAME = "product-image-collection"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.webp')
+
+def find_product_image(product_id: int, images_dir: str):
     """
-    Run the upload script for a specific product ID.
-    
+    Find the sample image for a product, whatever its extension.
+
     Args:
         product_id: Product ID (1-11)
-        stack: Target stack environment
-        
+        images_dir: Directory holding sample_<product_id>.<ext> files
+
     Returns:
-        bool: True if upload was successful, False otherwise
+        str: Path of the image, or None if there is none
     """
-    # Define the image path for this product
-    image_path = f"images/sample_{product_id}.png"
-    
-    # Check if image file exists
-    if not os.path.exists(image_path):
-        print(f"⚠️  Warning: Image file {image_path} does not exist, skipping product {product_id}")
-        return False
-    
-    # Define the command to run
-    script_path = "scripts/upload_product_images_to_s3.py"
-    cmd = [
-        "python",
-        script_path,
-        "--stack", stack,
-        "--product_id", str(product_id),
-        "--images", image_path
-    ]
-    
-    print(f"🚀 Uploading image for Product {product_id}: {image_path}")
-    print(f"   Command: {' '.join(cmd)}")
-    
-    try:
-        # Run the upload script
-        result = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        
-        print(f"✅ Successfully uploaded image for Product {product_id}")
-        if result.stdout:
-            # Print any output from the upload script (indented for readability)
-            for line in result.stdout.strip().split('\n'):
-                print(f"   {line}")
-        
-        return True
-        
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Failed to upload image for Product {product_id}")
-        print(f"   Error code: {e.returncode}")
-        if e.stdout:
-            print(f"   Stdout: {e.stdout}")
-        if e.stderr:
-            print(f"   Stderr: {e.stderr}")
-        return False
-    
-    except Exception as e:
-        print(f"❌ Unexpected error uploading image for Product {product_id}: {str(e)}")
-        return False
+    for extension in IMAGE_EXTENSIONS:
+        image_path = os.path.join(images_dir, f"sample_{product_id}{extension}")
+        if os.path.exists(image_path):
+            return image_path
+    return None
 
 def main():
     """Main function to batch upload all product images."""
-    
+
     import argparse
-    
+
     parser = argparse.ArgumentParser(description='Batch upload product images to S3')
-    parser.add_argument('--stack', 
+    parser.add_argument('--stack',
                        choices=['local', 'demo', 'stage', 'prod'],
                        default='local',
                        help='Stack environment (default: local)')
@@ -85,77 +53,113 @@ def main():
                        type=str,
                        default='1,2,3,4,5,6,7,8,9,10,11',
                        help='Comma-separated list of product IDs (default: 1,2,3,4,5,6,7,8,9,10,11)')
+    parser.add_argument('--images-dir',
+                       type=str,
+                       default='images',
+                       help='Directory containing sample_<product_id> images (default: images)')
+    parser.add_argument('--workers',
+                       type=int,
+                       default=8,
+                       help='Number of concurrent uploads (default: 8)')
+    parser.add_argument('--force',
+                       action='store_true',
+                       help='Upload every image, even if S3 already has the same content')
     parser.add_argument('--continue-on-error',
                        action='store_true',
                        help='Continue uploading even if some products fail')
-    
+
     args = parser.parse_args()
-    
+
     # Parse product IDs
     try:
         product_ids = [int(pid.strip()) for pid in args.products.split(',')]
     except ValueError as e:
         print(f"❌ Error parsing product IDs: {e}")
         sys.exit(1)
-    
+
     print("=" * 60)
     print("🎯 BATCH PRODUCT IMAGE UPLOAD")
     print("=" * 60)
     print(f"📦 Target Stack: {args.stack}")
     print(f"🛍️  Products: {product_ids}")
+    print(f"🧵 Workers: {args.workers}")
     print(f"🔄 Continue on error: {args.continue_on_error}")
     print("=" * 60)
-    
-    # Check if upload script exists
-    script_path = "scripts/upload_product_images_to_s3.py"
-    if not os.path.exists(script_path):
-        print(f"❌ Upload script not found: {script_path}")
-        print("   Make sure you're running this from the project root directory")
-        sys.exit(1)
-    
+
     # Check if images directory exists
-    if not os.path.exists("images"):
-        print("❌ Images directory not found: images/")
-        print("   Make sure the images/ directory exists with sample_*.png files")
+    if not os.path.exists(args.images_dir):
+        print(f"❌ Images directory not found: {args.images_dir}/")
+        print("   Make sure the images directory exists with sample_* files")
+        sys.exit(1)
+
+    # One client and one bucket check for the whole run
+    s3_client = get_s3_client(args.stack, max_pool_connections=args.workers)
+    if not create_bucket_if_not_exists(s3_client, BUCKET_NAME, args.stack):
         sys.exit(1)
-    
+
     # Track results
     successful_uploads = 0
+    unchanged_uploads = 0
     failed_uploads = 0
     skipped_uploads = 0
-    
-    # Upload images for each product
+
+    uploads = {}
     for product_id in product_ids:
-        print(f"\n📸 Processing Product {product_id}...")
-        
-        # Check if image exists before attempting upload
-        image_path = f"images/sample_{product_id}.png"
-        if not os.path.exists(image_path):
-            print(f"⏭️  Skipping Product {product_id}: Image {image_path} not found")
+        image_path = find_product_image(product_id, args.images_dir)
+        if image_path is None:
+            print(f"⏭️  Skipping Product {product_id}: no sample_{product_id} image in {args.images_dir}/")
             skipped_uploads += 1
             continue
-        
-        success = run_upload_for_product(product_id, args.stack)
-        
-        if success:
-            successful_uploads += 1
-        else:
-            failed_uploads += 1
-            
-            if not args.continue_on_error:
-                print(f"\n💥 Stopping batch upload due to failure on Product {product_id}")
-                print("   Use --continue-on-error to skip failed uploads and continue")
-                break
-    
+        uploads[product_id] = image_path
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                upload_image_to_s3, s3_client, BUCKET_NAME, product_id, image_path,
+                skip_unchanged=not args.force
+            ): product_id
+            for product_id, image_path in uploads.items()
+        }
+
+        for future in as_completed(futures):
+            product_id = futures[future]
+            result = future.result()
+
+            if result == 'uploaded':
+                print(f"✅ Uploaded image for Product {product_id}")
+                successful_uploads += 1
+            elif result == 'unchanged':
+                print(f"⏩ Product {product_id} is already up to date")
+                unchanged_uploads += 1
+            else:
+                print(f"❌ Failed to upload image for Product {product_id}")
+                failed_uploads += 1
+
+                if not args.continue_on_error:
+                    print(f"\n💥 Stopping batch upload due to failure on Product {product_id}")
+                    print("   Use --continue-on-error to skip failed uploads and continue")
+                    for pending in futures:
+                        pending.cancel()
+                    break
+    elapsed = time.perf_counter() - start
+
     # Print summary
     print("\n" + "=" * 60)
     print("📊 BATCH UPLOAD SUMMARY")
     print("=" * 60)
     print(f"✅ Successful uploads: {successful_uploads}")
+    print(f"⏩ Unchanged (not re-uploaded): {unchanged_uploads}")
     print(f"❌ Failed uploads: {failed_uploads}")
     print(f"⏭️  Skipped uploads: {skipped_uploads}")
-    print(f"📝 Total processed: {successful_uploads + failed_uploads + skipped_uploads}")
-    
+    print(f"📝 Total processed: {successful_uploads + unchanged_uploads + failed_uploads + skipped_uploads}")
+    print(f"⏱️  Elapsed: {elapsed:.2f}s")
+
+    if successful_uploads > 0:
+        # Uploads made here bypass Django, so the image manifest does not know them yet
+        print("\n🗂️  Record the new images in the image manifest with:")
+        print("   cd backend && python manage.py reconcile_image_manifest --apply")
+
     if failed_uploads > 0:
         print(f"\n⚠️  {failed_uploads} uploads failed. Check the logs above for details.")
         sys.exit(1)
@@ -165,4 +169,4 @@ def main():
         print(f"\n🎉 All uploads completed successfully!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,12 +1,20 @@
 import argparse
 import boto3
+import hashlib
 import os
 import sys
+from botocore.config import Config
+from botocore.exceptions import ClientError
 from pathlib import Path
 from typing import List
 
-def get_s3_client(stack: str):
-    """Get S3 client based on stack environment"""
+def get_s3_client(stack: str, max_pool_connections: int = 10):
+    """Get S3 client based on stack environment
+    
+    The client is thread-safe, so one instance can be shared by a pool of
+    upload threads as long as the connection pool is at least as large.
+    """
+    config = Config(max_pool_connections=max_pool_connections)
     if stack == "local":
         # For localstack
         return boto3.client(
@@ -14,14 +22,47 @@ def get_s3_client(stack: str):
             endpoint_url='http://localhost:4566',
             aws_access_key_id='test',
             aws_secret_access_key='test',
-            region_name='us-east-1'
+            region_name='us-east-1',
+            config=config
         )
     else:
         # For AWS environments (demo, stage, prod)
-        return boto3.client('s3')
+        return boto3.client('s3', config=config)
+
+def file_md5(image_path: str) -> str:
+    """Hex MD5 of a local file, read in chunks"""
+    digest = hashlib.md5()
+    with open(image_path, 'rb') as image_file:
+        for chunk in iter(lambda: image_file.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
 
-def upload_image_to_s3(s3_client, bucket_name: str, product_id: int, image_path: str) -> bool:
-    """Upload a single image to S3"""
+def is_unchanged_in_s3(s3_client, bucket_name: str, s3_key: str, md5: str) -> bool:
+    """Check whether the object in S3 already has the given content
+    
+    Single-part uploads have the MD5 as their ETag. Multipart ETags are not
+    a plain MD5, so those are compared against the md5 metadata written by
+    upload_image_to_s3 instead.
+    """
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=s3_key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+
+    etag = response.get('ETag', '').strip('"')
+    if '-' not in etag:
+        return etag == md5
+    return response.get('Metadata', {}).get('md5') == md5
+
+def upload_image_to_s3(s3_client, bucket_name: str, product_id: int, image_path: str,
+                       skip_unchanged: bool = False) -> str:
+    """Upload a single image to S3
+    
+    Returns:
+        'uploaded', 'unchanged' (only with skip_unchanged) or 'failed'
+    """
     try:
         # Get the filename from the path
         filename = Path(image_path).name
@@ -32,16 +73,21 @@ def upload_image_to_s3(s3_client, bucket_name: str, product_id: int, image_path:
         # Check if file exists
         if not os.path.exists(image_path):
             print(f"Error: File {image_path} does not exist")
-            return False
+            return 'failed'
+        
+        md5 = file_md5(image_path)
+        if skip_unchanged and is_unchanged_in_s3(s3_client, bucket_name, s3_key, md5):
+            print(f"Unchanged, skipped {image_path} (s3://{bucket_name}/{s3_key})")
+            return 'unchanged'
         
         # Upload the file
-        s3_client.upload_file(image_path, bucket_name, s3_key)
+        s3_client.upload_file(image_path, bucket_name, s3_key, ExtraArgs={'Metadata': {'md5': md5}})
         print(f"Successfully uploaded {image_path} to s3://{bucket_name}/{s3_key}")
-        return True
+        return 'uploaded'
         
     except Exception as e:
         print(f"Error uploading {image_path}: {str(e)}")
-        return False
+        return 'failed'
 
 def create_bucket_if_not_exists(s3_client, bucket_name: str, stack: str):
     """Create bucket if it doesn't exist (mainly for localstack)"""
@@ -115,7 +161,7 @@ def main():
         failed_uploads = 0
         
         for image_path in image_paths:
-            if upload_image_to_s3(s3_client, bucket_name, args.product_id, image_path):
+            if upload_image_to_s3(s3_client, bucket_name, args.product_id, image_path) == 'uploaded':
                 successful_uploads += 1
             else:
                 failed_uploads += 1